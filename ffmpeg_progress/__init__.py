@@ -8,6 +8,7 @@ See https://gist.github.com/pruperting/397509/1068d4ced44ded986d0f52ddb4253cfee4
 from __future__ import annotations
 
 from .exceptions import FFMPEGProgressError
-from .lib import ffprobe, start
+from .job import Job
+from .lib import ffprobe, start, start_job
 
-__all__ = ('FFMPEGProgressError', 'ffprobe', 'start')
+__all__ = ('FFMPEGProgressError', 'Job', 'ffprobe', 'start', 'start_job')
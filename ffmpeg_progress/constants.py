@@ -3,7 +3,11 @@ from __future__ import annotations
 
 import os
 
-__all__ = ('LINESEP_BYTES', 'PERCENT_100')
+__all__ = ('LINESEP_BYTES', 'MAX_DATAGRAM_SIZE', 'PERCENT_100', 'STATUS_REQUEST')
 
 LINESEP_BYTES = os.linesep.encode()
+MAX_DATAGRAM_SIZE = 65536
+"""Largest datagram read from the daemon socket."""
 PERCENT_100 = 100.0
+STATUS_REQUEST = b'status'
+"""Datagram sent to the daemon to request a snapshot of the job table."""
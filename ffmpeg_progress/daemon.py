@@ -0,0 +1,309 @@
+"""Node-level progress aggregation over a Unix domain socket."""
+from __future__ import annotations
+
+from collections import deque
+from contextlib import suppress
+from pathlib import Path
+from tempfile import gettempdir
+from time import monotonic, time
+from typing import TYPE_CHECKING, cast
+import json
+import os
+import socket
+import stat
+import uuid
+
+from .constants import MAX_DATAGRAM_SIZE, STATUS_REQUEST
+from .exceptions import DaemonRunning, InsecureSocketDirectory, NotASocket
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .typing import JobStatusDict, OnMessageCallback, ProgressSample
+
+__all__ = ('ProgressDaemon', 'ProgressReporter', 'default_socket_path', 'query_status')
+
+
+def default_socket_path() -> Path:
+    """
+    Get the default path of the daemon socket.
+
+    This is ``ffmpeg-progress.sock`` in ``XDG_RUNTIME_DIR`` if it is set, otherwise in a per-user
+    directory in the temporary directory. That directory is created with mode ``0700`` so that
+    other users cannot bind the socket first or talk to the daemon.
+
+    Returns
+    -------
+    Path
+        Socket path.
+
+    Raises
+    ------
+    InsecureSocketDirectory
+        If the per-user directory exists but is not a directory owned by the current user that only
+        they can access.
+    """
+    if runtime_dir := os.environ.get('XDG_RUNTIME_DIR'):
+        return Path(runtime_dir) / 'ffmpeg-progress.sock'
+    directory = Path(gettempdir()) / f'ffmpeg-progress-{os.getuid()}'
+    directory.mkdir(mode=0o700, exist_ok=True)
+    info = directory.lstat()
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or stat.S_IMODE(info.st_mode) & 0o077):
+        raise InsecureSocketDirectory(directory)
+    return directory / 'ffmpeg-progress.sock'
+
+
+def _is_int(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value: object) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ProgressReporter:
+    """
+    Push progress samples of a job to the daemon.
+
+    Pass :py:meth:`on_message` and :py:meth:`on_done` to :py:func:`ffmpeg_progress.lib.start`.
+    Samples are buffered and sent in one datagram at most every ``flush_interval`` seconds. Sending
+    never blocks: if the daemon is not running or its queue is full, samples are dropped.
+
+    Parameters
+    ----------
+    file : str | Path
+        File being processed.
+    socket_path : str | Path | None
+        Daemon socket path. Defaults to :py:func:`default_socket_path`.
+    job_id : str | None
+        Job identifier. Defaults to a random identifier.
+    on_message : OnMessageCallback | None
+        Callback to forward messages to, such as for terminal output.
+    on_done : Callable[[], None] | None
+        Callback to forward completion to.
+    flush_interval : float
+        Minimum time between datagrams. Seconds.
+    max_samples : int
+        Maximum number of samples kept between datagrams. Older samples are dropped.
+    """
+    def __init__(self,
+                 file: str | Path,
+                 socket_path: str | Path | None = None,
+                 job_id: str | None = None,
+                 on_message: OnMessageCallback | None = None,
+                 on_done: Callable[[], None] | None = None,
+                 flush_interval: float = 1.0,
+                 max_samples: int = 16) -> None:
+        self.file = str(file)
+        """File being processed."""
+        self.job_id = job_id or uuid.uuid4().hex
+        """Job identifier."""
+        self.socket_path = str(socket_path or default_socket_path())
+        """Daemon socket path."""
+        self.flush_interval = flush_interval
+        """Minimum time between datagrams. Seconds."""
+        self._on_message = on_message
+        self._on_done = on_done
+        self._samples: deque[ProgressSample] = deque(maxlen=max_samples)
+        self._last_flush = 0.0
+        self._last_sample: ProgressSample = (self.job_id, self.file, 0.0, 0, 0, 0.0, False)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)  # noqa: FBT003
+
+    def on_message(self, percent: float, fr_cnt: int, total_frames: int, elapsed: float) -> None:
+        """
+        Record a progress sample.
+
+        Parameters
+        ----------
+        percent : float
+            Percentage completed.
+        fr_cnt : int
+            Frame count.
+        total_frames : int
+            Total frame count.
+        elapsed : float
+            Elapsed time in seconds.
+        """
+        if self._on_message:
+            self._on_message(percent, fr_cnt, total_frames, elapsed)
+        sample = (self.job_id, self.file, round(percent, 2), fr_cnt, total_frames, round(
+            elapsed, 2), False)
+        self._samples.append(sample)
+        self._last_sample = sample
+        if monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def on_done(self) -> None:
+        """Mark the job as done, send pending samples and close the socket."""
+        self._samples.append((*self._last_sample[:-1], True))
+        self.flush()
+        self._socket.close()
+        if self._on_done:
+            self._on_done()
+
+    def flush(self) -> None:
+        """Send pending samples to the daemon without blocking."""
+        self._last_flush = monotonic()
+        if not self._samples:
+            return
+        data = json.dumps(list(self._samples), separators=(',', ':')).encode()
+        self._samples.clear()
+        # Drop the samples if the daemon is not running or is too slow.
+        with suppress(OSError):
+            self._socket.sendto(data, self.socket_path)
+
+
+class ProgressDaemon:
+    """
+    In-memory table of active jobs fed by :py:class:`ProgressReporter` instances.
+
+    Parameters
+    ----------
+    socket_path : str | Path | None
+        Socket path. Defaults to :py:func:`default_socket_path`.
+    expire_after : float
+        Time after which a job that has not sent a sample is removed. Seconds.
+    done_linger : float
+        Time a finished job is kept in the table. Seconds.
+    """
+    def __init__(self,
+                 socket_path: str | Path | None = None,
+                 expire_after: float = 60.0,
+                 done_linger: float = 10.0) -> None:
+        self.socket_path = Path(socket_path or default_socket_path())
+        """Socket path."""
+        self.expire_after = expire_after
+        """Time after which a job that has not sent a sample is removed. Seconds."""
+        self.done_linger = done_linger
+        """Time a finished job is kept in the table. Seconds."""
+        self.jobs: dict[str, JobStatusDict] = {}
+        """Active jobs by identifier."""
+
+    def handle(self, data: bytes) -> bytes | None:
+        """
+        Handle a datagram.
+
+        Parameters
+        ----------
+        data : bytes
+            Datagram.
+
+        Returns
+        -------
+        bytes | None
+            Reply to send back, if any.
+        """
+        if data == STATUS_REQUEST:
+            return json.dumps(self.jobs, separators=(',', ':')).encode()
+        try:
+            samples = json.loads(data)
+            now = time()
+            for job_id, file, percent, frames, total_frames, elapsed, done in samples:
+                if not (isinstance(job_id, str) and isinstance(file, str) and _is_number(percent)
+                        and _is_int(frames) and _is_int(total_frames) and _is_number(elapsed)
+                        and isinstance(done, bool)):
+                    continue  # Ignore malformed samples.
+                self.jobs[job_id] = {
+                    'done': done,
+                    'elapsed': elapsed,
+                    'file': file,
+                    'frames': frames,
+                    'percent': percent,
+                    'total_frames': total_frames,
+                    'updated': now
+                }
+        except (TypeError, ValueError):
+            pass  # Ignore malformed datagrams.
+        return None
+
+    def prune(self) -> None:
+        """Remove finished and stale jobs."""
+        now = time()
+        for job_id, status in tuple(self.jobs.items()):
+            age = now - status['updated']
+            if age > self.expire_after or (status['done'] and age > self.done_linger):
+                del self.jobs[job_id]
+
+    def serve_forever(self) -> None:
+        """
+        Bind the socket and serve until interrupted.
+
+        Raises
+        ------
+        DaemonRunning
+            If another daemon is using the socket.
+        NotASocket
+            If the path exists and is not a socket.
+        """
+        try:
+            mode = self.socket_path.lstat().st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise NotASocket(self.socket_path)
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as probe:
+                try:
+                    probe.connect(str(self.socket_path))
+                except OSError:
+                    self.socket_path.unlink()  # Stale socket.
+                else:
+                    raise DaemonRunning(self.socket_path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.bind(str(self.socket_path))
+            sock.settimeout(1.0)
+            try:
+                while True:
+                    self._serve_once(sock)
+            finally:
+                self.socket_path.unlink(missing_ok=True)
+
+    def _serve_once(self, sock: socket.socket) -> None:
+        try:
+            data, address = sock.recvfrom(MAX_DATAGRAM_SIZE)
+        except TimeoutError:
+            pass
+        else:
+            if (reply := self.handle(data)) is not None and address:
+                # Send the reply in chunks followed by an empty datagram.
+                view = memoryview(reply)
+                with suppress(OSError):  # Client went away.
+                    for offset in range(0, len(view), MAX_DATAGRAM_SIZE):
+                        sock.sendto(view[offset:offset + MAX_DATAGRAM_SIZE], address)
+                    sock.sendto(b'', address)
+        self.prune()
+
+
+def query_status(socket_path: str | Path | None = None,
+                 timeout: float = 2.0) -> dict[str, JobStatusDict]:
+    """
+    Get a snapshot of the job table from the daemon.
+
+    Parameters
+    ----------
+    socket_path : str | Path | None
+        Daemon socket path. Defaults to :py:func:`default_socket_path`.
+    timeout : float
+        Time to wait for the reply. Seconds.
+
+    Returns
+    -------
+    dict[str, JobStatusDict]
+        Jobs by identifier.
+
+    Raises
+    ------
+    ValueError
+        If the reply is not valid JSON.
+    """  # noqa: DOC502
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        # Bind to an automatically assigned abstract address so the daemon can reply.
+        sock.bind('')
+        sock.settimeout(timeout)
+        sock.sendto(STATUS_REQUEST, str(socket_path or default_socket_path()))
+        chunks = []
+        while chunk := sock.recv(MAX_DATAGRAM_SIZE):
+            chunks.append(chunk)
+        return cast('dict[str, JobStatusDict]', json.loads(b''.join(chunks)))
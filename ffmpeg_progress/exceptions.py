@@ -1,7 +1,13 @@
 """Exceptions."""
 from __future__ import annotations
 
-__all__ = ('FFMPEGProgressError', 'InvalidFPS', 'InvalidPID', 'NoDuration', 'ProbeFailed',
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__all__ = ('DaemonRunning', 'FFMPEGFailed', 'FFMPEGProgressError', 'InsecureSocketDirectory',
+           'InvalidFPS', 'InvalidPID', 'LaunchFailed', 'NoDuration', 'NotASocket', 'ProbeFailed',
            'TotalFramesLTEZero', 'UnexpectedZeroFPS')
 
 
@@ -43,3 +49,35 @@ class InvalidPID(FFMPEGProgressError):
     """Raised when the ffmpeg callback does not return a valid PID."""
     def __init__(self) -> None:
         super().__init__('ffmpeg callback must return a valid PID.')
+
+
+class DaemonRunning(FFMPEGProgressError):
+    """Raised when a progress daemon is already listening on the socket."""
+    def __init__(self, socket_path: Path) -> None:
+        super().__init__(f'A daemon is already listening on {socket_path}.')
+
+
+class NotASocket(FFMPEGProgressError):
+    """Raised when the daemon socket path exists and is not a socket."""
+    def __init__(self, socket_path: Path) -> None:
+        super().__init__(f'{socket_path} exists and is not a socket.')
+
+
+class LaunchFailed(FFMPEGProgressError):
+    """Raised when resource limits cannot be applied to a new ffmpeg process."""
+    def __init__(self, error: Exception) -> None:
+        super().__init__(f'Cannot apply resource limits to ffmpeg: {error}')
+
+
+class FFMPEGFailed(FFMPEGProgressError):
+    """Raised when ffmpeg exits with a non-zero status."""
+    def __init__(self, returncode: int) -> None:
+        super().__init__(f'ffmpeg exited with status {returncode}.')
+        self.returncode = returncode
+        """Exit status."""
+
+
+class InsecureSocketDirectory(FFMPEGProgressError):
+    """Raised when the directory of the default daemon socket is not private to the user."""
+    def __init__(self, path: Path) -> None:
+        super().__init__(f'{path} must be a directory owned by the current user with mode 0700.')
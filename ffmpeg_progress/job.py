@@ -0,0 +1,162 @@
+"""Progress accounting for encodes with several passes and outputs."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from .constants import PERCENT_100
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ('Job',)
+
+
+class Job:
+    """
+    Progress of an encode made of ``passes`` ffmpeg runs, each writing ``outputs`` output files.
+
+    Every ``(pass, output)`` pair is weighted by the product of its pass weight and its output
+    weight. Overall progress is the weighted mean of the completion of each pair. Progress of
+    finished passes is kept when moving to the next pass.
+
+    Parameters
+    ----------
+    total_frames : int | Sequence[int]
+        Total number of frames of each output. A single value is used for all outputs.
+    passes : int
+        Number of passes.
+    outputs : int
+        Number of outputs. Ignored if ``total_frames`` is a sequence.
+    pass_weights : Sequence[float] | None
+        Relative cost of each pass. Defaults to equal weights.
+    output_weights : Sequence[float] | None
+        Relative cost of each output. Defaults to equal weights.
+
+    Raises
+    ------
+    ValueError
+        If the counts or weights are invalid.
+    """
+    def __init__(self,
+                 total_frames: int | Sequence[int],
+                 passes: int = 1,
+                 outputs: int = 1,
+                 pass_weights: Sequence[float] | None = None,
+                 output_weights: Sequence[float] | None = None) -> None:
+        if isinstance(total_frames, int):
+            total_frames = (total_frames,) * outputs
+        output_totals = tuple(total_frames)
+        pass_weights = tuple(pass_weights) if pass_weights is not None else (1.0,) * passes
+        if output_weights is None:
+            output_weights = (1.0,) * len(output_totals)
+        output_weights = tuple(output_weights)
+        if passes < 1 or not output_totals:
+            msg = 'A job needs at least one pass and one output.'
+            raise ValueError(msg)
+        if any(x <= 0 for x in output_totals):
+            msg = 'Total frames must be greater than zero.'
+            raise ValueError(msg)
+        if len(pass_weights) != passes or len(output_weights) != len(output_totals):
+            msg = 'There must be one weight per pass and one weight per output.'
+            raise ValueError(msg)
+        if (any(x < 0 for x in (*pass_weights, *output_weights)) or not sum(pass_weights)
+                or not sum(output_weights)):
+            msg = 'Weights must not be negative and must not all be zero.'
+            raise ValueError(msg)
+        self._frames = [[0] * len(output_totals) for _ in range(passes)]
+        self._output_totals = output_totals
+        self._pass_weights = pass_weights
+        self._output_weights = output_weights
+        self._weight_sum = sum(pass_weights) * sum(output_weights)
+        self.pass_index = 0
+        """Index of the current pass, starting at 0."""
+        self.start_time = datetime.now(tz=timezone.utc)
+        """Time the job was created."""
+
+    @property
+    def passes(self) -> int:
+        """Number of passes."""
+        return len(self._pass_weights)
+
+    @property
+    def outputs(self) -> int:
+        """Number of outputs."""
+        return len(self._output_totals)
+
+    @property
+    def done(self) -> bool:
+        """Whether all passes are complete."""
+        return self.pass_index >= self.passes
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the job was created."""
+        return (datetime.now(tz=timezone.utc) - self.start_time).total_seconds()
+
+    @property
+    def frames(self) -> int:
+        """Number of frames processed over all passes and outputs."""
+        return sum(
+            min(frames, total) for pass_frames in self._frames
+            for frames, total in zip(pass_frames, self._output_totals, strict=True))
+
+    @property
+    def total_frames(self) -> int:
+        """Number of frames to process over all passes and outputs."""
+        return self.passes * sum(self._output_totals)
+
+    @property
+    def pass_complete(self) -> bool:
+        """Whether every output of the current pass has reached its total frame count."""
+        if self.done:
+            return True
+        current = self._frames[self.pass_index]
+        return all(
+            frames >= total for frames, total in zip(current, self._output_totals, strict=True))
+
+    @property
+    def percent(self) -> float:
+        """Weighted overall percentage completed."""
+        completed = 0.0
+        for pass_weight, pass_frames in zip(self._pass_weights, self._frames, strict=True):
+            for output_weight, frames, total in zip(self._output_weights,
+                                                    pass_frames,
+                                                    self._output_totals,
+                                                    strict=True):
+                completed += pass_weight * output_weight * min(frames / total, 1.0)
+        return PERCENT_100 * completed / self._weight_sum
+
+    def update(self, output: int, frames: int) -> bool:
+        """
+        Record the frame count of an output in the current pass.
+
+        Frame counts never go backwards. Outputs outside of the job (such as audio-only outputs
+        reported by ffmpeg) are ignored.
+
+        Parameters
+        ----------
+        output : int
+            Output index, as reported by ffmpeg.
+        frames : int
+            Frame count.
+
+        Returns
+        -------
+        bool
+            ``True`` if the count changed.
+        """
+        if self.done or not 0 <= output < self.outputs:
+            return False
+        pass_frames = self._frames[self.pass_index]
+        if frames <= pass_frames[output]:
+            return False
+        pass_frames[output] = frames
+        return True
+
+    def next_pass(self) -> None:
+        """Mark the current pass as complete and move to the next one."""
+        if self.done:
+            return
+        self._frames[self.pass_index] = list(self._output_totals)
+        self.pass_index += 1
@@ -0,0 +1,178 @@
+"""ffmpeg launcher."""
+from __future__ import annotations
+
+from contextlib import suppress
+from typing import TYPE_CHECKING
+import os
+import shutil
+import subprocess as sp
+import sys
+
+import psutil
+
+from .exceptions import LaunchFailed
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+
+    from .typing import IONiceClass
+
+__all__ = ('cpu_slice', 'launch_ffmpeg')
+
+
+def cpu_slice(job_index: int, jobs: int, cpus: Iterable[int] | None = None) -> tuple[int, ...]:
+    """
+    Get the set of CPUs a job should be pinned to.
+
+    The available CPUs are split into ``jobs`` contiguous, disjoint slices. If there are more jobs
+    than CPUs, each job gets a single CPU and CPUs are shared round-robin.
+
+    Parameters
+    ----------
+    job_index : int
+        Index of the job, starting at 0.
+    jobs : int
+        Total number of concurrent jobs.
+    cpus : Iterable[int] | None
+        CPUs to split. Defaults to the CPUs the current process may run on.
+
+    Returns
+    -------
+    tuple[int, ...]
+        CPU numbers.
+
+    Raises
+    ------
+    ValueError
+        If ``job_index`` is not within ``[0, jobs)``.
+    """
+    if not 0 <= job_index < jobs:
+        msg = f'Job index must be within [0, {jobs}).'
+        raise ValueError(msg)
+    if cpus is None:
+        cpus = (os.sched_getaffinity(0)
+                if hasattr(os, 'sched_getaffinity') else range(os.cpu_count() or 1))
+    available = sorted(cpus)
+    if jobs >= len(available):
+        return (available[job_index % len(available)],)
+    size, extra = divmod(len(available), jobs)
+    start = job_index * size + min(job_index, extra)
+    return tuple(available[start:start + size + (job_index < extra)])
+
+
+def _set_ionice(pid: int, ionice_class: IONiceClass, ionice_value: int | None) -> None:
+    classes = {
+        'best-effort': psutil.IOPRIO_CLASS_BE,
+        'idle': psutil.IOPRIO_CLASS_IDLE,
+        'realtime': psutil.IOPRIO_CLASS_RT
+    }
+    # The idle class does not take a priority level.
+    psutil.Process(pid).ionice(classes[ionice_class],
+                               None if ionice_class == 'idle' else ionice_value)
+
+
+def _limit_thread(tid: int, cpus: tuple[int, ...] | None, nice: int | None,
+                  ionice_class: IONiceClass | None, ionice_value: int | None) -> None:
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(tid, cpus)
+    if nice is not None:
+        os.setpriority(os.PRIO_PROCESS, tid, nice)
+    if ionice_class is not None:
+        _set_ionice(tid, ionice_class, ionice_value)
+
+
+def _apply_limits(pid: int, cpus: tuple[int, ...] | None, nice: int | None,
+                  ionice_class: IONiceClass | None, ionice_value: int | None) -> None:
+    _limit_thread(pid, cpus, nice, ionice_class, ionice_value)
+    if not sys.platform.startswith('linux'):
+        return
+    # On Linux these settings are per thread. Threads created from now on inherit them from the
+    # main thread but threads ffmpeg has already started have to be updated one by one.
+    for thread in psutil.Process(pid).threads():
+        if thread.id != pid:
+            with suppress(ProcessLookupError, psutil.NoSuchProcess):  # Thread exited.
+                _limit_thread(thread.id, cpus, nice, ionice_class, ionice_value)
+
+
+def launch_ffmpeg(in_file: str | Path,
+                  outfile: str | Path,
+                  vstats_path: str,
+                  args: Sequence[str] = (),
+                  *,
+                  cpus: Iterable[int] | None = None,
+                  executable: str = 'ffmpeg',
+                  ionice_class: IONiceClass | None = None,
+                  ionice_value: int | None = None,
+                  nice: int | None = None,
+                  threads: int | None = None) -> sp.Popen[bytes]:
+    """
+    Start ffmpeg with resource limits applied.
+
+    This function has the signature expected by :py:func:`ffmpeg_progress.lib.start`. Use
+    :py:func:`functools.partial` to bind the keyword arguments.
+
+    The executable is resolved to an absolute path and file descriptors are not closed by
+    :py:mod:`subprocess` so that it may use ``posix_spawn()`` instead of ``fork()``/``exec()``. This
+    is safe because Python creates non-inheritable file descriptors by default.
+
+    CPU affinity, niceness and I/O scheduling class are applied to the new process right after it
+    is spawned. On Linux, where these are per-thread settings, they are applied to every thread of
+    the process. A thread started by ffmpeg while the settings are being applied may keep the
+    previous settings.
+
+    If ``threads`` is not passed and ``cpus`` is, ffmpeg is passed ``-threads`` with the number of
+    CPUs so that its thread pools match the CPU set. Any ``-threads`` option in ``args`` takes
+    precedence.
+
+    Parameters
+    ----------
+    in_file : str | Path
+        Input file.
+    outfile : str | Path
+        Output file.
+    vstats_path : str
+        Path to pass to ``-vstats_file``.
+    args : Sequence[str]
+        Additional output arguments for ffmpeg.
+    cpus : Iterable[int] | None
+        CPUs to pin ffmpeg to. See :py:func:`cpu_slice`.
+    executable : str
+        ffmpeg executable name or path.
+    ionice_class : IONiceClass | None
+        I/O scheduling class.
+    ionice_value : int | None
+        I/O priority within the scheduling class (0 to 7, lower is higher priority).
+    nice : int | None
+        Niceness.
+    threads : int | None
+        Thread budget passed to ffmpeg with ``-threads``.
+
+    Returns
+    -------
+    subprocess.Popen[bytes]
+        The ffmpeg process.
+
+    Raises
+    ------
+    LaunchFailed
+        If a setting cannot be applied, such as a negative niceness without privileges or an I/O
+        priority out of range. ffmpeg is killed.
+    """
+    cpus = tuple(cpus) if cpus is not None else None
+    if threads is None and cpus:
+        threads = len(cpus)
+    threads_args = ('-threads', str(threads)) if threads else ()
+    process = sp.Popen(
+        (shutil.which(executable) or executable, '-nostats', '-loglevel', '0', '-y', '-vstats_file',
+         vstats_path, '-i', str(in_file), *threads_args, *args, str(outfile)),
+        close_fds=False)
+    try:
+        _apply_limits(process.pid, cpus, nice, ionice_class, ionice_value)
+    except (ProcessLookupError, psutil.NoSuchProcess):  # pragma: no cover
+        pass  # ffmpeg exited already. The monitor will notice.
+    except (OSError, ValueError, psutil.Error) as e:  # ValueError: such as an I/O priority > 7.
+        process.kill()
+        process.wait()
+        raise LaunchFailed(e) from e
+    return process
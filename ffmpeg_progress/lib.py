@@ -5,17 +5,17 @@ from collections.abc import Callable
 from datetime import datetime, timezone
 from pathlib import Path
 from tempfile import mkstemp
-from time import sleep
+from time import perf_counter_ns, sleep
 from typing import TYPE_CHECKING, cast
 import json
 import os
-import re
 import subprocess as sp
 
 import psutil
 
 from .constants import LINESEP_BYTES, PERCENT_100
 from .exceptions import (
+    FFMPEGFailed,
     InvalidFPS,
     InvalidPID,
     NoDuration,
@@ -23,12 +23,18 @@ from .exceptions import (
     TotalFramesLTEZero,
     UnexpectedZeroFPS,
 )
+from .job import Job
 from .utils import default_on_message
+from .vstats import iter_vstats_records, parse_vstats_line
 
 if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from .tracing import Tracer
     from .typing import OnMessageCallback, ProbeDict
+    from .vstats import VStatsHistory
 
-__all__ = ('ffprobe', 'start')
+__all__ = ('ffprobe', 'start', 'start_job')
 
 
 def ffprobe(in_file: Path | str) -> ProbeDict:
@@ -53,15 +59,38 @@ def ffprobe(in_file: Path | str) -> ProbeDict:
                 encoding='utf-8')))
 
 
+def _is_running(pid: int, process: sp.Popen[bytes] | None) -> bool:
+    if process is not None:
+        return process.poll() is None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+
+
+def _read_new_lines(vstats_fd: int, offset: int, partial: bytes) -> tuple[list[str], int, bytes]:
+    # Read everything written since `offset`. `partial` is an incomplete line from the last call.
+    chunks = [partial]
+    while chunk := os.pread(vstats_fd, 65536, offset):
+        offset += len(chunk)
+        chunks.append(chunk)
+    *lines, partial = b''.join(chunks).split(LINESEP_BYTES)
+    return [x.decode().strip() for x in lines], offset, partial
+
+
 def display(total_frames: int,
             vstats_fd: int,
             pid: int,
             on_message: OnMessageCallback | None = None,
-            wait_time: float = 1.0) -> None:
+            wait_time: float = 1.0,
+            process: sp.Popen[bytes] | None = None,
+            tracer: Tracer | None = None) -> None:
     """
     Generate messages for display of progress.
 
-    Call ``on_message`` argument when one is available.
+    Call ``on_message`` argument when one is available. Only complete lines of the statistics file
+    are parsed. A line that ffmpeg has not finished writing is kept until the next tick.
 
     Parameters
     ----------
@@ -79,43 +108,143 @@ def display(total_frames: int,
 
     wait_time : float
         Wait time between messages. Seconds.
+
+    process : subprocess.Popen[bytes] | None
+        ffmpeg process handle. If passed, it is used to check if ffmpeg is still running instead of
+        querying the PID.
+    tracer : Tracer | None
+        If passed, the duration of each phase of every tick is recorded.
     """
     start_time = datetime.now(tz=timezone.utc)
     fr_cnt = 0
     elapsed = percent = 0.0
-    len_linesep = len(LINESEP_BYTES)
     if not on_message:  # pragma: no cover
         on_message = default_on_message
+    offset = 0
+    partial = b''
     while fr_cnt < total_frames and percent < PERCENT_100:
         sleep(wait_time)
-        try:
-            os.kill(pid, 0)
-        except ProcessLookupError:
+        tick = perf_counter_ns() if tracer is not None else 0
+        running = _is_running(pid, process)
+        if tracer is not None:
+            tick = tracer.mark('liveness', tick)
+        if not running:
             break
-        if psutil.Process(pid).status() == psutil.STATUS_ZOMBIE:
-            break
-        try:
-            pos_end = os.lseek(vstats_fd, -2, os.SEEK_END)
-        except OSError:  # pragma: no cover
-            continue  # Not enough data in file
-        pos_start = None
-        while os.read(vstats_fd, len_linesep) != LINESEP_BYTES:
-            pos_start = os.lseek(vstats_fd, -2, os.SEEK_CUR)
-        if pos_start is None:
+        lines, offset, partial = _read_new_lines(vstats_fd, offset, partial)
+        if tracer is not None:
+            tick = tracer.mark('read', tick)
+        if not lines:
             continue
-        last = os.read(vstats_fd, pos_end - pos_start).decode().strip()
-        try:
-            vstats = int(re.split(r'\s+', last)[5])
-        except IndexError:
-            vstats = 0
-        if vstats > fr_cnt:
-            fr_cnt = vstats
-            percent = 100 * (fr_cnt / total_frames)
+        for line in lines:
+            if (record := parse_vstats_line(line)) is not None and record.frame > fr_cnt:
+                fr_cnt = record.frame
+        percent = 100 * (fr_cnt / total_frames)
         elapsed = (datetime.now(tz=timezone.utc) - start_time).total_seconds()
+        if tracer is not None:
+            tick = tracer.mark('parse', tick)
         on_message(percent, fr_cnt, total_frames, elapsed)
+        if tracer is not None:
+            tracer.mark('on_message', tick)
+
+
+def display_job(job: Job,
+                vstats_fd: int,
+                pid: int,
+                on_message: OnMessageCallback | None = None,
+                wait_time: float = 1.0,
+                process: sp.Popen[bytes] | None = None,
+                tracer: Tracer | None = None) -> None:
+    """
+    Generate messages for display of progress of the current pass of a job.
+
+    Each message reports the overall progress of the job. Returns when every output of the current
+    pass is complete or when ffmpeg exits.
+
+    ffmpeg writes a line per output for each frame, so every line written since the last tick is
+    read, not only the last one.
+
+    Parameters
+    ----------
+    job : Job
+        The job.
+
+    vstats_fd : int
+        Video statistics file descriptor.
+
+    pid : int
+        ffmpeg PID.
+
+    on_message : OnMessageCallback | None
+        The on-message callback.
+
+    wait_time : float
+        Wait time between messages. Seconds.
+
+    process : subprocess.Popen[bytes] | None
+        ffmpeg process handle. If passed, it is used to check if ffmpeg is still running instead of
+        querying the PID.
+    tracer : Tracer | None
+        If passed, the duration of each phase of every tick is recorded.
+    """
+    if not on_message:  # pragma: no cover
+        on_message = default_on_message
+    offset = 0
+    partial = b''
+    while not job.pass_complete:
+        sleep(wait_time)
+        tick = perf_counter_ns() if tracer is not None else 0
+        running = _is_running(pid, process)
+        if tracer is not None:
+            tick = tracer.mark('liveness', tick)
+        if not running:
+            break
+        lines, offset, partial = _read_new_lines(vstats_fd, offset, partial)
+        if tracer is not None:
+            tick = tracer.mark('read', tick)
+        if not lines:
+            continue
+        for line in lines:
+            if (record := parse_vstats_line(line)) is not None:
+                job.update(record.output, record.frame)
+        percent, frames, total_frames, elapsed = (job.percent, job.frames, job.total_frames,
+                                                  job.elapsed)
+        if tracer is not None:
+            tick = tracer.mark('parse', tick)
+        on_message(percent, frames, total_frames, elapsed)
+        if tracer is not None:
+            tracer.mark('on_message', tick)
+
+
+def _probe(in_file: Path) -> ProbeDict:
+    try:
+        return ffprobe(in_file)
+    except (sp.CalledProcessError, ValueError) as e:  # Not a media file or invalid output.
+        raise ProbeFailed from e
+
+
+def _total_frames(probe: ProbeDict, index: int) -> int:
+    try:
+        probe['streams'][index]
+    except (IndexError, KeyError) as e:
+        raise ProbeFailed from e
+    try:
+        fps = cast('float', eval(probe['streams'][index]['avg_frame_rate']))  # noqa: S307
+    except ZeroDivisionError as e:
+        raise InvalidFPS from e
+    if fps == 0:
+        raise UnexpectedZeroFPS
+    try:
+        dur = float(probe['format']['duration'])
+    except KeyError as e:
+        raise NoDuration from e
+    total_frames = int(dur * fps)
+    if total_frames <= 0:
+        raise TotalFramesLTEZero
+    return total_frames
 
 
-FFMPEGCallingFunction = Callable[[str | Path, str | Path, str], int]
+FFMPEGCallingFunction = Callable[[str | Path, str | Path, str], int | sp.Popen[bytes]]
+JobFFMPEGCallingFunction = Callable[[Path, tuple[str | Path, ...], str, int], int | sp.Popen[bytes]]
 
 
 def start(in_file: str | Path,
@@ -125,19 +254,26 @@ def start(in_file: str | Path,
           on_done: Callable[[], None] | None = None,
           index: int = 0,
           wait_time: float = 1.0,
-          initial_wait_time: float = 2.0) -> None:
+          initial_wait_time: float = 2.0,
+          history: VStatsHistory | None = None,
+          tracer: Tracer | None = None) -> None:
     """
     Start the process.
 
     Pass an input file path, an output file path, and a callable.
 
-    The callable ``(signature: (in_file, outfile, vstats_file) -> Any)`` passed in is expected to
-    start the ffmpeg process and pass the given stats path to the process (last argument):
+    The callable ``(signature: (in_file, outfile, vstats_file) -> int | Popen)`` passed in is
+    expected to start the ffmpeg process and pass the given stats path to the process (last
+    argument):
 
     .. code-block::
 
        ffmpeg -y -vstats_file ... -i ...
 
+    The callable must return the PID of ffmpeg or its :py:class:`subprocess.Popen` handle. When a
+    handle is returned, it is used to monitor the process and is waited on before ``on_done`` is
+    called. :py:func:`ffmpeg_progress.launcher.launch_ffmpeg` can be used as the callable.
+
     The on_message argument may be used to override the messaging, which by default writes to
     ``sys.stdout`` with basic information on the progress. It receives 4 arguments: percentage,
     frame count, total_frames, elapsed time in seconds (float).
@@ -171,6 +307,14 @@ def start(in_file: str | Path,
         Wait time between messages. Seconds.
     initial_wait_time : float
         Wait time before processing log file. Seconds.
+    history : VStatsHistory | None
+        If passed, every record of the statistics file is added to it once ffmpeg is done. Use
+        :py:meth:`VStatsHistory.summary() <ffmpeg_progress.vstats.VStatsHistory.summary>` for
+        quality checks without another pass over the output. The statistics file is only complete
+        if ``ffmpeg_func`` returns a :py:class:`subprocess.Popen` object.
+    tracer : Tracer | None
+        If passed, the duration of probing, the initial wait and each phase of every tick are
+        recorded. See :py:class:`ffmpeg_progress.tracing.Tracer`.
 
     Raises
     ------
@@ -180,31 +324,171 @@ def start(in_file: str | Path,
     NoDuration
     TotalFramesLTEZero
     InvalidPID
-    """
+    """  # noqa: DOC502
     in_file = Path(in_file)
-    probe = ffprobe(in_file)
-    try:
-        probe['streams'][index]
-    except (IndexError, KeyError) as e:
-        raise ProbeFailed from e
-    try:
-        fps = cast('float', eval(probe['streams'][index]['avg_frame_rate']))  # noqa: S307
-    except ZeroDivisionError as e:
-        raise InvalidFPS from e
-    if fps == 0:
-        raise UnexpectedZeroFPS
+    tick = perf_counter_ns() if tracer is not None else 0
+    total_frames = _total_frames(_probe(in_file), index)
+    if tracer is not None:
+        tracer.mark('probe', tick)
+    vstats_fd, vstats_path = mkstemp(suffix='.vstats', prefix=f'ffprog-{in_file.stem}')
     try:
-        dur = float(probe['format']['duration'])
-    except KeyError as e:
-        raise NoDuration from e
-    total_frames = int(dur * fps)
-    if total_frames <= 0:
-        raise TotalFramesLTEZero
+        ret = ffmpeg_func(in_file, outfile, vstats_path)
+        process, pid = (None, ret) if isinstance(ret, int) else (ret, ret.pid)
+        if not pid:
+            raise InvalidPID
+        tick = perf_counter_ns() if tracer is not None else 0
+        sleep(initial_wait_time)
+        if tracer is not None:
+            tracer.mark('initial_wait', tick)
+        display(total_frames,
+                vstats_fd,
+                pid,
+                on_message=on_message,
+                process=process,
+                tracer=tracer,
+                wait_time=wait_time)
+        if process is not None:
+            process.wait()
+        if history is not None:
+            history.extend(iter_vstats_records(vstats_fd))
+    finally:
+        os.close(vstats_fd)
+    if on_done:  # pragma: no cover
+        on_done()
+
+
+def start_job(in_file: str | Path,
+              outfiles: Sequence[str | Path],
+              ffmpeg_func: JobFFMPEGCallingFunction,
+              passes: int = 1,
+              on_message: OnMessageCallback | None = None,
+              on_done: Callable[[], None] | None = None,
+              index: int = 0,
+              output_frames: Sequence[int] | None = None,
+              output_weights: Sequence[float] | None = None,
+              pass_weights: Sequence[float] | None = None,
+              wait_time: float = 1.0,
+              initial_wait_time: float = 2.0,
+              history: VStatsHistory | None = None,
+              tracer: Tracer | None = None) -> Job:
+    """
+    Start a job of one or more ffmpeg passes, each writing one or more outputs.
+
+    This is like :py:func:`start` for multi-pass encodes (such as two-pass x264) and encodes with
+    several outputs (such as a bit rate ladder using ``-map``). The input is probed once. The
+    callable ``(signature: (in_file, outfiles, vstats_file, pass_number) -> int | Popen)`` is
+    called once per pass with the pass number starting at 1 and must start ffmpeg for that pass.
+    The same statistics file is used for every pass. The next pass is started only after ffmpeg
+    exits. If the callable returns a PID, the exit status is not known, so a failed pass is not
+    detected; return a :py:class:`subprocess.Popen` object to stop on failure.
+
+    The on-message callback receives the weighted overall percentage, the frame count and total
+    frame count over all passes and outputs, and the elapsed time since the job started.
+
+    Parameters
+    ----------
+    in_file : str | Path
+        Input file.
+    outfiles : Sequence[str | Path]
+        Output files, in the order ffmpeg numbers them.
+    ffmpeg_func : JobFFMPEGCallingFunction
+        The function running ffmpeg for a pass.
+    passes : int
+        Number of passes.
+    on_message : OnMessageCallback | None
+        The on-message callback.
+    on_done : Callable[[], None] | None
+        Completion callback.
+    index : int
+        Stream index used to calculate the number of frames.
+    output_frames : Sequence[int] | None
+        Number of frames of each output. Use when outputs change the frame rate. If not passed, the
+        input is probed.
+    output_weights : Sequence[float] | None
+        Relative cost of each output.
+    pass_weights : Sequence[float] | None
+        Relative cost of each pass.
+    wait_time : float
+        Wait time between messages. Seconds.
+    initial_wait_time : float
+        Wait time before processing log file for each pass. Seconds.
+    history : VStatsHistory | None
+        If passed, every record of the statistics file of the last pass is added to it once ffmpeg
+        is done.
+    tracer : Tracer | None
+        If passed, the duration of probing, the initial waits and each phase of every tick are
+        recorded. See :py:class:`ffmpeg_progress.tracing.Tracer`.
+
+    Returns
+    -------
+    Job
+        The finished job.
+
+    Raises
+    ------
+    ValueError
+        If the number of values in ``output_frames`` does not match the number of outputs.
+    ProbeFailed
+    InvalidFPS
+    UnexpectedZeroFPS
+    NoDuration
+    TotalFramesLTEZero
+    InvalidPID
+    FFMPEGFailed
+        If ``ffmpeg_func`` returns a :py:class:`subprocess.Popen` object and ffmpeg exits with a
+        non-zero status. Later passes are not run.
+    """  # noqa: DOC502
+    in_file = Path(in_file)
+    outfiles = tuple(outfiles)
+    if output_frames is not None and len(output_frames) != len(outfiles):
+        msg = 'There must be one frame count per output.'
+        raise ValueError(msg)
+    tick = perf_counter_ns() if tracer is not None else 0
+    total_frames = (output_frames if output_frames is not None else _total_frames(
+        _probe(in_file), index))
+    if tracer is not None and output_frames is None:
+        tracer.mark('probe', tick)
+    job = Job(total_frames,
+              output_weights=output_weights,
+              outputs=len(outfiles),
+              pass_weights=pass_weights,
+              passes=passes)
+    if not on_message:  # pragma: no cover
+        on_message = default_on_message
     vstats_fd, vstats_path = mkstemp(suffix='.vstats', prefix=f'ffprog-{in_file.stem}')
-    if not (pid := ffmpeg_func(in_file, outfile, vstats_path)):
-        raise InvalidPID
-    sleep(initial_wait_time)
-    display(total_frames, vstats_fd, pid, wait_time=wait_time, on_message=on_message)
-    os.close(vstats_fd)
+    try:
+        while not job.done:
+            # ffmpeg only truncates the file when it writes its first statistics line.
+            os.ftruncate(vstats_fd, 0)
+            ret = ffmpeg_func(in_file, outfiles, vstats_path, job.pass_index + 1)
+            process, pid = (None, ret) if isinstance(ret, int) else (ret, ret.pid)
+            if not pid:
+                raise InvalidPID
+            tick = perf_counter_ns() if tracer is not None else 0
+            sleep(initial_wait_time)
+            if tracer is not None:
+                tracer.mark('initial_wait', tick)
+            display_job(job,
+                        vstats_fd,
+                        pid,
+                        on_message=on_message,
+                        process=process,
+                        tracer=tracer,
+                        wait_time=wait_time)
+            if process is not None:
+                if process.wait():
+                    raise FFMPEGFailed(process.returncode)
+            else:
+                # The pass may look complete before ffmpeg exits. The next pass must not start
+                # until ffmpeg has finished writing its outputs and the pass log.
+                while _is_running(pid, None):
+                    sleep(wait_time)
+            job.next_pass()
+            on_message(job.percent, job.frames, job.total_frames, job.elapsed)
+        if history is not None:
+            history.extend(iter_vstats_records(vstats_fd))
+    finally:
+        os.close(vstats_fd)
     if on_done:  # pragma: no cover
         on_done()
+    return job
@@ -1,40 +1,298 @@
 """Entry point."""
 from __future__ import annotations
 
+from contextlib import suppress
+from functools import partial
 from pathlib import Path
 from tempfile import TemporaryFile
-import subprocess as sp
+from typing import TYPE_CHECKING
+import json
 
 import click
 
+from .daemon import ProgressDaemon, ProgressReporter, query_status
 from .exceptions import FFMPEGProgressError
+from .launcher import cpu_slice, launch_ffmpeg
 from .lib import start
+from .tracing import Tracer
+from .utils import default_on_message
+from .vstats import VStatsHistory
+from .watch import HotFolder
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .lib import FFMPEGCallingFunction
+    from .typing import IONiceClass, OnMessageCallback
 
 __all__ = ('main',)
 
 
-@click.command(name='ffmpeg-progress',
-               context_settings={
-                   'allow_extra_args': True,
-                   'help_option_names': ('-h', '--help'),
-                   'ignore_unknown_options': True
-               })
+class _DefaultCommandGroup(click.Group):
+    """Group that runs the ``encode`` command when the first argument is not a command name."""
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args = ['encode', *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultCommandGroup,
+             context_settings={'help_option_names': ('-h', '--help')},
+             name='ffmpeg-progress')
+def main() -> None:
+    """Get progress information for an ffmpeg process."""
+
+
+@main.command(context_settings={'allow_extra_args': True, 'ignore_unknown_options': True})
 @click.argument('file',
                 type=click.Path(exists=True, dir_okay=False, resolve_path=True, path_type=Path),
                 required=True)
+@click.option('--ionice',
+              'ionice_class',
+              help='I/O scheduling class for ffmpeg.',
+              type=click.Choice(('best-effort', 'idle', 'realtime')))
+@click.option('--ionice-level',
+              help='I/O priority within the scheduling class.',
+              type=click.IntRange(0, 7))
+@click.option('--job-index',
+              default=0,
+              help='Index of this job when running several jobs. Used with --jobs.',
+              type=click.IntRange(0))
+@click.option('--jobs',
+              help='Number of concurrent jobs. ffmpeg is pinned to a disjoint set of CPUs.',
+              type=click.IntRange(1))
+@click.option('--nice', help='Niceness of ffmpeg.', type=click.IntRange(-20, 19))
+@click.option('--report', help='Push progress to the progress daemon.', is_flag=True)
+@click.option('--socket',
+              'socket_path',
+              help='Progress daemon socket path.',
+              type=click.Path(dir_okay=False, path_type=Path))
+@click.option('--summary',
+              help='Print a JSON summary of the video statistics when done.',
+              is_flag=True)
+@click.option('--threads',
+              help='Thread budget for ffmpeg. Defaults to the number of CPUs when using --jobs.',
+              type=click.IntRange(1))
+@click.option('--trace',
+              'trace_path',
+              help=('Write timings of the monitor loop to this file in Chrome trace event format '
+                    'and print a per-phase summary to standard error.'),
+              type=click.Path(dir_okay=False, path_type=Path))
 @click.pass_context
-def main(context: click.Context, file: Path) -> None:
-    """Entry point for shell use."""  # noqa: DOC501
-
-    def ffmpeg(in_file: str | Path, outfile: str | Path,
-               vstats_path: str) -> int:  # pragma: no cover
-        return sp.Popen(('ffmpeg', '-nostats', '-loglevel', '0', '-y', '-vstats_file', vstats_path,
-                         '-i', in_file, *context.args[2:], outfile)).pid
+def encode(context: click.Context,
+           file: Path,
+           ionice_class: IONiceClass | None = None,
+           ionice_level: int | None = None,
+           job_index: int = 0,
+           jobs: int | None = None,
+           nice: int | None = None,
+           socket_path: Path | None = None,
+           threads: int | None = None,
+           trace_path: Path | None = None,
+           *,
+           report: bool = False,
+           summary: bool = False) -> None:
+    """
+    Encode a file with ffmpeg and display progress.
 
+    This is the default command. All unknown arguments are passed on to ffmpeg.
+    """  # noqa: DOC501
+    try:
+        cpus = cpu_slice(job_index, jobs) if jobs else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--job-index') from e
+    ffmpeg = partial(launch_ffmpeg,
+                     args=context.args[2:],
+                     cpus=cpus,
+                     ionice_class=ionice_class,
+                     ionice_value=ionice_level,
+                     nice=nice,
+                     threads=threads)
     with TemporaryFile('wb', prefix=file.stem, suffix=file.suffix) as tf:
         outfile = tf.name
+    on_done: Callable[[], None] = print
+    on_message: OnMessageCallback | None = None
+    history = VStatsHistory() if summary else None
+    tracer = Tracer() if trace_path else None
+    try:
+        if report:
+            reporter = ProgressReporter(file,
+                                        on_done=on_done,
+                                        on_message=default_on_message,
+                                        socket_path=socket_path)
+            on_done = reporter.on_done
+            on_message = reporter.on_message
+        start(file,
+              outfile,
+              ffmpeg,
+              history=history,
+              on_done=on_done,
+              on_message=on_message,
+              tracer=tracer)
+    except FFMPEGProgressError as e:
+        click.echo(str(e), err=True)
+        raise click.Abort from e
+    finally:
+        if tracer is not None and trace_path is not None:
+            tracer.write_chrome_trace(trace_path)
+            click.echo(json.dumps(tracer.summary(), indent=2), err=True)
+    if history is not None:
+        click.echo(json.dumps(history.summary(), indent=2))
+
+
+@main.command
+@click.option('--done-linger',
+              default=10.0,
+              help='Seconds a finished job is kept in the table.',
+              type=click.FloatRange(0))
+@click.option('--expire-after',
+              default=60.0,
+              help='Seconds after which a job that stopped reporting is removed.',
+              type=click.FloatRange(0))
+@click.option('--socket',
+              'socket_path',
+              help='Socket path.',
+              type=click.Path(dir_okay=False, path_type=Path))
+def daemon(done_linger: float = 10.0,
+           expire_after: float = 60.0,
+           socket_path: Path | None = None) -> None:
+    """Collect progress of jobs started with --report."""  # noqa: DOC501
+    try:
+        ProgressDaemon(socket_path, done_linger=done_linger,
+                       expire_after=expire_after).serve_forever()
+    except FFMPEGProgressError as e:
+        click.echo(str(e), err=True)
+        raise click.Abort from e
+    except KeyboardInterrupt:
+        pass
+
+
+@main.command
+@click.option('--json', 'as_json', help='Output JSON.', is_flag=True)
+@click.option('--socket',
+              'socket_path',
+              help='Progress daemon socket path.',
+              type=click.Path(dir_okay=False, path_type=Path))
+def status(socket_path: Path | None = None, *, as_json: bool = False) -> None:
+    """Show jobs known to the progress daemon."""  # noqa: DOC501
     try:
-        start(file, outfile, ffmpeg, on_done=print)
+        jobs = query_status(socket_path)
     except FFMPEGProgressError as e:
         click.echo(str(e), err=True)
         raise click.Abort from e
+    except OSError as e:
+        click.echo('Progress daemon is not running.', err=True)
+        raise click.Abort from e
+    except ValueError as e:
+        click.echo('Invalid reply from the progress daemon.', err=True)
+        raise click.Abort from e
+    if as_json:
+        click.echo(json.dumps(jobs, indent=2, sort_keys=True))
+        return
+    if not jobs:
+        click.echo('No active jobs.')
+        return
+    for job_id, job in sorted(jobs.items(), key=lambda x: x[1]['file']):
+        click.echo(f'{job_id[:8]}  {job["percent"]:5.1f}%  {job["frames"]:d} / '
+                   f'{job["total_frames"]:d} frames  {job["elapsed"]:.0f} s  '
+                   f'{"done" if job["done"] else "running"}  {job["file"]}')
+
+
+@main.command(context_settings={'allow_extra_args': True, 'ignore_unknown_options': True})
+@click.argument('directory',
+                type=click.Path(exists=True, file_okay=False, resolve_path=True, path_type=Path))
+@click.option('-o',
+              '--output-dir',
+              help='Directory to write output files to.',
+              required=True,
+              type=click.Path(exists=True, file_okay=False, resolve_path=True, path_type=Path))
+@click.option('--extension',
+              help='Extension of output files. Defaults to the extension of the input file.')
+@click.option('--ionice',
+              'ionice_class',
+              help='I/O scheduling class for ffmpeg.',
+              type=click.Choice(('best-effort', 'idle', 'realtime')))
+@click.option('--ionice-level',
+              help='I/O priority within the scheduling class.',
+              type=click.IntRange(0, 7))
+@click.option(
+    '--jobs',
+    default=1,
+    help=('Number of concurrent encodes. If greater than 1, each ffmpeg process is pinned '
+          'to a disjoint set of CPUs.'),
+    type=click.IntRange(1))
+@click.option('--journal',
+              'journal_path',
+              help='State journal path. Defaults to a hidden file in DIRECTORY.',
+              type=click.Path(dir_okay=False, path_type=Path))
+@click.option('--nice', help='Niceness of ffmpeg.', type=click.IntRange(-20, 19))
+@click.option('--report', help='Push progress to the progress daemon.', is_flag=True)
+@click.option('--settle-time',
+              default=5.0,
+              help='Seconds the size of an existing file must not change before it is processed.',
+              type=click.FloatRange(0))
+@click.option('--socket',
+              'socket_path',
+              help='Progress daemon socket path.',
+              type=click.Path(dir_okay=False, path_type=Path))
+@click.option('--suffix',
+              'suffixes',
+              help='Only process files with this suffix, such as .mov. May be repeated.',
+              multiple=True)
+@click.option('--threads', help='Thread budget for ffmpeg.', type=click.IntRange(1))
+@click.pass_context
+def watch(context: click.Context,
+          directory: Path,
+          output_dir: Path,
+          extension: str | None = None,
+          ionice_class: IONiceClass | None = None,
+          ionice_level: int | None = None,
+          jobs: int = 1,
+          journal_path: Path | None = None,
+          nice: int | None = None,
+          settle_time: float = 5.0,
+          socket_path: Path | None = None,
+          suffixes: tuple[str, ...] = (),
+          threads: int | None = None,
+          *,
+          report: bool = False) -> None:
+    """
+    Encode files as they are written to a directory.
+
+    All unknown arguments are passed on to ffmpeg. Processed files are recorded in a journal so
+    they are not processed again after a restart.
+    """  # noqa: DOC501
+
+    def make_ffmpeg_func(slot: int) -> FFMPEGCallingFunction:
+        return partial(launch_ffmpeg,
+                       args=context.args,
+                       cpus=cpu_slice(slot, jobs) if jobs > 1 else None,
+                       ionice_class=ionice_class,
+                       ionice_value=ionice_level,
+                       nice=nice,
+                       threads=threads)
+
+    def on_finished(in_file: Path, error: str | None) -> None:
+        if error:
+            click.echo(f'Failed: {in_file}: {error}', err=True)
+        else:
+            click.echo(f'Done: {in_file}')
+
+    try:
+        hot_folder = HotFolder(
+            directory,
+            output_dir,
+            extension=extension,
+            jobs=jobs,
+            journal_path=journal_path,
+            make_ffmpeg_func=make_ffmpeg_func,
+            on_finished=on_finished,
+            on_started=lambda in_file, outfile: click.echo(f'Started: {in_file} -> {outfile}'),
+            report=report,
+            settle_time=settle_time,
+            socket_path=socket_path,
+            suffixes=suffixes)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--output-dir') from e
+    with suppress(KeyboardInterrupt):
+        hot_folder.run()
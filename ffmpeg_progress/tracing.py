@@ -0,0 +1,164 @@
+"""Timing instrumentation of the monitor loop."""
+from __future__ import annotations
+
+from array import array
+from pathlib import Path
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, get_args
+import json
+import os
+import threading
+
+from .typing import TracePhase
+
+if TYPE_CHECKING:
+    from .typing import TracePhaseSummaryDict
+
+__all__ = ('Tracer',)
+
+_PHASES: tuple[TracePhase, ...] = get_args(TracePhase)
+
+
+class Tracer:
+    """
+    Record how long each phase of :py:func:`ffmpeg_progress.lib.start` takes.
+
+    Pass an instance as the ``tracer`` argument of :py:func:`ffmpeg_progress.lib.start`,
+    :py:func:`ffmpeg_progress.lib.start_job`, :py:func:`ffmpeg_progress.lib.display` or
+    :py:func:`ffmpeg_progress.lib.display_job`. When no tracer is passed nothing is timed.
+
+    The recorded phases are:
+
+    - ``probe``: running ffprobe.
+    - ``initial_wait``: waiting before processing the statistics file.
+    - ``liveness``: checking if ffmpeg is still running.
+    - ``read``: reading the last line of the statistics file.
+    - ``parse``: parsing the line and updating progress.
+    - ``on_message``: calling the on-message callback.
+
+    Per-phase aggregates cover every event. Individual events (used for the Chrome trace) are kept
+    up to ``max_events``; later events are only counted in the aggregates.
+
+    Parameters
+    ----------
+    max_events : int
+        Maximum number of events kept for :py:meth:`chrome_trace`.
+    """
+    def __init__(self, max_events: int = 100000) -> None:
+        self.max_events = max_events
+        """Maximum number of events kept for :py:meth:`chrome_trace`."""
+        self.origin = perf_counter_ns()
+        """Time the tracer was created, in nanoseconds of :py:func:`time.perf_counter_ns`."""
+        self._lock = threading.Lock()
+        self._phase = array('B')
+        self._start = array('q')
+        self._duration = array('q')
+        self._thread = array('q')
+        self._count = [0] * len(_PHASES)
+        self._total = [0] * len(_PHASES)
+        self._min = [0] * len(_PHASES)
+        self._max = [0] * len(_PHASES)
+
+    def mark(self, phase: TracePhase, start: int) -> int:
+        """
+        Record a phase that started at ``start`` and ends now.
+
+        Parameters
+        ----------
+        phase : TracePhase
+            Phase name.
+        start : int
+            Start time from :py:func:`time.perf_counter_ns`.
+
+        Returns
+        -------
+        int
+            End time, for use as the start of the next phase.
+        """
+        end = perf_counter_ns()
+        self.record(phase, start, end)
+        return end
+
+    def record(self, phase: TracePhase, start: int, end: int) -> None:
+        """
+        Record a phase.
+
+        Parameters
+        ----------
+        phase : TracePhase
+            Phase name.
+        start : int
+            Start time from :py:func:`time.perf_counter_ns`.
+        end : int
+            End time from :py:func:`time.perf_counter_ns`.
+        """
+        index = _PHASES.index(phase)
+        duration = end - start
+        with self._lock:
+            count = self._count[index]
+            self._count[index] = count + 1
+            self._total[index] += duration
+            self._min[index] = duration if not count else min(self._min[index], duration)
+            self._max[index] = max(self._max[index], duration)
+            if len(self._phase) < self.max_events:
+                self._phase.append(index)
+                self._start.append(start)
+                self._duration.append(duration)
+                self._thread.append(threading.get_native_id())
+
+    def summary(self) -> dict[TracePhase, TracePhaseSummaryDict]:
+        """
+        Get statistics of each recorded phase.
+
+        Returns
+        -------
+        dict[TracePhase, TracePhaseSummaryDict]
+            Statistics by phase, in seconds.
+        """
+        with self._lock:
+            return {
+                phase: {
+                    'count': count,
+                    'max': self._max[i] / 1e9,
+                    'mean': self._total[i] / count / 1e9,
+                    'min': self._min[i] / 1e9,
+                    'total': self._total[i] / 1e9
+                }
+                for i, (phase, count) in enumerate(zip(_PHASES, self._count, strict=True)) if count
+            }
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """
+        Get the recorded events in Chrome trace event format.
+
+        The result can be loaded in ``chrome://tracing`` or Perfetto.
+
+        Returns
+        -------
+        dict[str, Any]
+            Trace object.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = [{
+                'cat': 'ffmpeg-progress',
+                'dur': duration / 1000,
+                'name': _PHASES[phase],
+                'ph': 'X',
+                'pid': pid,
+                'tid': tid,
+                'ts': (start - self.origin) / 1000
+            } for phase, start, duration, tid in zip(
+                self._phase, self._start, self._duration, self._thread, strict=True)]
+        return {'displayTimeUnit': 'ms', 'traceEvents': events}
+
+    def write_chrome_trace(self, path: str | Path) -> None:
+        """
+        Write the recorded events in Chrome trace event format.
+
+        Parameters
+        ----------
+        path : str | Path
+            Output file.
+        """
+        Path(path).write_text(json.dumps(self.chrome_trace()), encoding='utf-8')
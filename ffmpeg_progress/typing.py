@@ -1,12 +1,52 @@
 """Typing helpers."""
 from __future__ import annotations
 
-__all__ = ('OnMessageCallback', 'ProbeDict', 'ProbeFormatDict', 'ProbeStreamDict')
+__all__ = ('IONiceClass', 'JobStatusDict', 'JournalEntryDict', 'JournalStatus', 'OnMessageCallback',
+           'ProbeDict', 'ProbeFormatDict', 'ProbeStreamDict', 'ProgressSample', 'TracePhase',
+           'TracePhaseSummaryDict', 'VStatsSummaryDict')
 
 from collections.abc import Callable, Sequence
-from typing import TypedDict
+from typing import Literal, TypedDict
 
+IONiceClass = Literal['best-effort', 'idle', 'realtime']
+JournalStatus = Literal['done', 'failed']
 OnMessageCallback = Callable[[float, int, int, float], None]
+ProgressSample = tuple[str, str, float, int, int, float, bool]
+TracePhase = Literal['probe', 'initial_wait', 'liveness', 'read', 'parse', 'on_message']
+
+
+class JobStatusDict(TypedDict):
+    """Status of a job in the progress daemon."""
+    done: bool
+    """Whether the job is finished."""
+    elapsed: float
+    """Elapsed time in seconds."""
+    file: str
+    """File being processed."""
+    frames: int
+    """Frame count."""
+    percent: float
+    """Percentage completed."""
+    total_frames: int
+    """Total frame count."""
+    updated: float
+    """Time of the last sample as a Unix timestamp."""
+
+
+class JournalEntryDict(TypedDict):
+    """Line of the state journal of a watched directory."""
+    file: str
+    """Input file."""
+    mtime_ns: int
+    """Modification time of the input file in nanoseconds."""
+    output: str
+    """Output file."""
+    size: int
+    """Size of the input file in bytes."""
+    status: JournalStatus
+    """Result of processing the file."""
+    time: float
+    """Time the file was processed as a Unix timestamp."""
 
 
 class ProbeStreamDict(TypedDict):
@@ -23,3 +63,51 @@ class ProbeDict(TypedDict, total=False):
     """Minimal representation of what ffprobe returns in its JSON output."""
     format: ProbeFormatDict
     streams: Sequence[ProbeStreamDict]
+
+
+class TracePhaseSummaryDict(TypedDict):
+    """Timing statistics of a phase. Durations are in seconds."""
+    count: int
+    """Number of times the phase was recorded."""
+    max: float
+    """Longest duration."""
+    mean: float
+    """Mean duration."""
+    min: float
+    """Shortest duration."""
+    total: float
+    """Total duration."""
+
+
+class VStatsSummaryDict(TypedDict):
+    """Summary of video statistics records."""
+    avg_bitrate: float | None
+    """Average bit rate of the last record in kbit/s."""
+    duration: float | None
+    """Time of the last record in seconds."""
+    frames: int
+    """Frame number of the last record."""
+    max_bitrate: float | None
+    """Highest frame bit rate in kbit/s."""
+    max_frame_size: int
+    """Largest frame size in bytes."""
+    picture_types: dict[str, int]
+    """Number of frames of each picture type."""
+    psnr_mean: float | None
+    """Mean PSNR."""
+    psnr_min: float | None
+    """Lowest PSNR."""
+    psnr_p5: float | None
+    """5th percentile of PSNR values in the history buffer."""
+    psnr_p50: float | None
+    """Median of PSNR values in the history buffer."""
+    q_max: float | None
+    """Highest quantiser."""
+    q_mean: float | None
+    """Mean quantiser."""
+    q_min: float | None
+    """Lowest quantiser."""
+    records: int
+    """Number of records."""
+    stream_size: float | None
+    """Stream size of the last record in kB."""
@@ -0,0 +1,312 @@
+"""Video statistics (``-vstats_file``) parsing and history."""
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from math import floor, inf, isnan, nan
+from typing import TYPE_CHECKING, NamedTuple
+import os
+import re
+
+from .constants import LINESEP_BYTES
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    from .typing import VStatsSummaryDict
+
+__all__ = ('VStatsHistory', 'VStatsRecord', 'iter_vstats_records', 'parse_vstats_line')
+
+_FIELD_RE = re.compile(r'(\w+)=\s*(\S+)')
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+(?:\.\d+)?|inf|nan)', re.IGNORECASE)
+
+
+class VStatsRecord(NamedTuple):
+    """A line of a video statistics file."""
+    output: int
+    """Output file index."""
+    stream: int
+    """Output stream index."""
+    frame: int
+    """Frame number."""
+    q: float
+    """Quantiser."""
+    psnr: float
+    """PSNR. ``nan`` if ffmpeg was not run with ``-psnr``."""
+    frame_size: int
+    """Frame size in bytes."""
+    stream_size: float
+    """Stream size so far in kB."""
+    time: float
+    """Time of the frame in seconds."""
+    bitrate: float
+    """Bit rate of the frame in kbit/s."""
+    avg_bitrate: float
+    """Average bit rate so far in kbit/s."""
+    picture_type: str
+    """Picture type such as ``I``, ``P`` or ``B``."""
+
+
+def _number(value: str) -> float:
+    # Values may have a unit suffix such as `kB`, `KiB` or `kbits/s`. PSNR can be `inf`.
+    if (m := _NUMBER_RE.match(value)) is None:
+        raise ValueError(value)
+    return float(m.group())
+
+
+def parse_vstats_line(line: str) -> VStatsRecord | None:
+    """
+    Parse a line of a video statistics file.
+
+    Both ``-vstats_version`` 1 and 2 lines are supported.
+
+    Parameters
+    ----------
+    line : str
+        Line.
+
+    Returns
+    -------
+    VStatsRecord | None
+        The record or ``None`` if the line is incomplete or invalid.
+    """
+    fields = dict(_FIELD_RE.findall(line))
+    try:
+        return VStatsRecord(output=int(fields.get('out', 0)),
+                            stream=int(fields.get('st', 0)),
+                            frame=int(fields['frame']),
+                            q=_number(fields['q']),
+                            psnr=_number(fields['PSNR']) if 'PSNR' in fields else nan,
+                            frame_size=int(fields['f_size']),
+                            stream_size=_number(fields['s_size']),
+                            time=_number(fields['time']),
+                            bitrate=_number(fields['br']),
+                            avg_bitrate=_number(fields['avg_br']),
+                            picture_type=fields['type'])
+    except (KeyError, ValueError):
+        return None
+
+
+def iter_vstats_records(vstats_fd: int, chunk_size: int = 65536) -> Iterator[VStatsRecord]:
+    """
+    Read every record of a video statistics file.
+
+    The file is read from the start with ``pread()`` so the file offset is not changed.
+
+    Parameters
+    ----------
+    vstats_fd : int
+        Video statistics file descriptor.
+    chunk_size : int
+        Number of bytes to read at a time.
+
+    Yields
+    ------
+    VStatsRecord
+        Records in file order. Invalid lines are skipped.
+    """
+    offset = 0
+    rest = b''
+    while chunk := os.pread(vstats_fd, chunk_size, offset):
+        offset += len(chunk)
+        *lines, rest = (rest + chunk).split(LINESEP_BYTES)
+        for line in lines:
+            if (record := parse_vstats_line(line.decode())) is not None:
+                yield record
+    if rest and (record := parse_vstats_line(rest.decode())) is not None:
+        yield record
+
+
+def _percentile(sorted_values: Sequence[float], percent: float) -> float:
+    # Linear interpolation between closest ranks.
+    k = (len(sorted_values) - 1) * percent / 100
+    lower = floor(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+class VStatsHistory:
+    """
+    Bounded history of video statistics records with streaming aggregates.
+
+    The last ``capacity`` records are kept in a ring buffer of one :py:class:`array.array` per
+    field. Aggregates such as the quantiser range and the maximum bit rate cover every record ever
+    added. PSNR percentiles are calculated over the records in the buffer.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of records kept.
+
+    Raises
+    ------
+    ValueError
+        If ``capacity`` is less than 1.
+    """
+    def __init__(self, capacity: int = 4096) -> None:
+        if capacity < 1:
+            msg = 'Capacity must be at least 1.'
+            raise ValueError(msg)
+        self.capacity = capacity
+        """Maximum number of records kept."""
+        self.count = 0
+        """Number of records added."""
+        self._head = 0
+        self._output = array('i', (0,)) * capacity
+        self._stream = array('i', (0,)) * capacity
+        self._frame = array('q', (0,)) * capacity
+        self._q = array('d', (0,)) * capacity
+        self._psnr = array('d', (0,)) * capacity
+        self._frame_size = array('q', (0,)) * capacity
+        self._stream_size = array('d', (0,)) * capacity
+        self._time = array('d', (0,)) * capacity
+        self._bitrate = array('d', (0,)) * capacity
+        self._avg_bitrate = array('d', (0,)) * capacity
+        self._picture_type = array('B', (0,)) * capacity
+        self._columns = (self._output, self._stream, self._frame, self._q, self._psnr,
+                         self._frame_size, self._stream_size, self._time, self._bitrate,
+                         self._avg_bitrate, self._picture_type)
+        self._last: VStatsRecord | None = None
+        self._q_min = inf
+        self._q_max = -inf
+        self._q_sum = 0.0
+        self._psnr_count = 0
+        self._psnr_sum = 0.0
+        self._psnr_min = inf
+        self._max_bitrate = -inf
+        self._max_frame_size = 0
+        self._picture_types: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        """Get the number of records in the buffer."""
+        return min(self.count, self.capacity)
+
+    def append(self, record: VStatsRecord) -> None:
+        """
+        Add a record, replacing the oldest record if the buffer is full.
+
+        Parameters
+        ----------
+        record : VStatsRecord
+            Record to add.
+        """
+        head = self._head
+        self._output[head] = record.output
+        self._stream[head] = record.stream
+        self._frame[head] = record.frame
+        self._q[head] = record.q
+        self._psnr[head] = record.psnr
+        self._frame_size[head] = record.frame_size
+        self._stream_size[head] = record.stream_size
+        self._time[head] = record.time
+        self._bitrate[head] = record.bitrate
+        self._avg_bitrate[head] = record.avg_bitrate
+        self._picture_type[head] = ord(record.picture_type[:1] or '?')
+        self._head = (self._head + 1) % self.capacity
+        self.count += 1
+        self._last = record
+        self._q_sum += record.q
+        self._q_min = min(self._q_min, record.q)
+        self._q_max = max(self._q_max, record.q)
+        if not isnan(record.psnr):
+            self._psnr_count += 1
+            self._psnr_sum += record.psnr
+            self._psnr_min = min(self._psnr_min, record.psnr)
+        self._max_bitrate = max(self._max_bitrate, record.bitrate)
+        self._max_frame_size = max(self._max_frame_size, record.frame_size)
+        self._picture_types[record.picture_type] += 1
+
+    def extend(self, records: Iterable[VStatsRecord]) -> None:
+        """
+        Add records.
+
+        Parameters
+        ----------
+        records : Iterable[VStatsRecord]
+            Records to add.
+        """
+        for record in records:
+            self.append(record)
+
+    def _ordered(self, column: array[int] | array[float]) -> list[float]:
+        if self.count < self.capacity:
+            return list(column[:self.count])
+        return [*column[self._head:], *column[:self._head]]
+
+    def __iter__(self) -> Iterator[VStatsRecord]:
+        """
+        Iterate over the records in the buffer, oldest first.
+
+        Yields
+        ------
+        VStatsRecord
+            Records.
+        """
+        columns = [self._ordered(column) for column in self._columns[:-1]]
+        picture_types = (chr(int(x)) for x in self._ordered(self._picture_type))
+        for values in zip(*columns, picture_types, strict=True):
+            yield VStatsRecord._make(values)
+
+    @property
+    def bitrates(self) -> list[float]:
+        """Frame bit rates in the buffer in kbit/s, oldest first."""
+        return self._ordered(self._bitrate)
+
+    @property
+    def psnr_values(self) -> list[float]:
+        """PSNR values in the buffer, oldest first. Frames without a PSNR value are skipped."""
+        return [x for x in self._ordered(self._psnr) if not isnan(x)]
+
+    @property
+    def q_values(self) -> list[float]:
+        """Quantisers in the buffer, oldest first."""
+        return self._ordered(self._q)
+
+    def psnr_percentile(self, percent: float) -> float:
+        """
+        Get a percentile of the PSNR values in the buffer.
+
+        Parameters
+        ----------
+        percent : float
+            Percentile, from 0 to 100.
+
+        Returns
+        -------
+        float
+            The percentile or ``nan`` if there are no PSNR values.
+        """
+        if not (values := sorted(self.psnr_values)):
+            return nan
+        return _percentile(values, percent)
+
+    def summary(self) -> VStatsSummaryDict:
+        """
+        Get a summary suitable for quality checks of an encode.
+
+        Values that are not available (such as PSNR without ``-psnr``) are ``None``.
+
+        Returns
+        -------
+        VStatsSummaryDict
+            Summary.
+        """
+        last = self._last
+        psnr = sorted(self.psnr_values)
+        return {
+            'avg_bitrate': last.avg_bitrate if last else None,
+            'duration': last.time if last else None,
+            'frames': last.frame if last else 0,
+            'max_bitrate': self._max_bitrate if last else None,
+            'max_frame_size': self._max_frame_size,
+            'picture_types': dict(sorted(self._picture_types.items())),
+            'psnr_mean': self._psnr_sum / self._psnr_count if self._psnr_count else None,
+            'psnr_min': self._psnr_min if self._psnr_count else None,
+            'psnr_p5': _percentile(psnr, 5) if psnr else None,
+            'psnr_p50': _percentile(psnr, 50) if psnr else None,
+            'q_max': self._q_max if last else None,
+            'q_mean': self._q_sum / self.count if last else None,
+            'q_min': self._q_min if last else None,
+            'records': self.count,
+            'stream_size': last.stream_size if last else None
+        }
@@ -0,0 +1,510 @@
+"""Hot folder watching and a long-lived transcode loop."""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from pathlib import Path
+from queue import SimpleQueue
+from time import monotonic, sleep, time
+from typing import TYPE_CHECKING, cast
+import ctypes
+import json
+import os
+import select
+import struct
+import subprocess as sp
+import threading
+
+from .daemon import ProgressReporter
+from .exceptions import FFMPEGProgressError
+from .launcher import cpu_slice, launch_ffmpeg
+from .lib import start
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from concurrent.futures import Future
+
+    from .lib import FFMPEGCallingFunction
+    from .typing import JournalEntryDict, JournalStatus, OnMessageCallback
+
+__all__ = ('DirectoryWatcher', 'HotFolder', 'StateJournal')
+
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_TO = 0x80
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal ``inotify`` binding for a single directory."""
+    def __init__(self, directory: Path) -> None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1() failed.')
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory),
+                                  _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, 'inotify_add_watch() failed.')
+
+    def read(self, timeout: float) -> list[str]:
+        """Wait up to ``timeout`` seconds for events and get the names of the files affected."""
+        if not select.select((self.fd,), (), (), timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:  # pragma: no cover
+            return []
+        names = []
+        offset = 0
+        while offset < len(data):
+            *_, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            if name := data[offset:offset + length].rstrip(b'\0'):
+                names.append(os.fsdecode(name))
+            offset += length
+        return names
+
+    def close(self) -> None:
+        """Close the ``inotify`` instance."""
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    Report files of a directory once they have been completely written.
+
+    On Linux, ``inotify`` is used: a file is ready as soon as a writer closes it
+    (``IN_CLOSE_WRITE``) or it is moved into the directory (``IN_MOVED_TO``). Files that already
+    exist when the watcher is created, and all files on systems without ``inotify``, are ready once
+    their size has not changed for ``settle_time`` seconds.
+
+    Hidden files are ignored. The directory is not watched recursively.
+
+    Parameters
+    ----------
+    directory : str | Path
+        Directory to watch.
+    settle_time : float
+        Time the size of a file must not change for it to be considered complete. Seconds.
+    poll_interval : float
+        Maximum time :py:meth:`poll` waits. Seconds.
+    suffixes : Iterable[str] | None
+        File name suffixes to accept, such as ``.mov``. Case-insensitive. Defaults to all files.
+    """
+    def __init__(self,
+                 directory: str | Path,
+                 settle_time: float = 5.0,
+                 poll_interval: float = 1.0,
+                 suffixes: Iterable[str] | None = None) -> None:
+        self.directory = Path(directory)
+        """Directory being watched."""
+        self.settle_time = settle_time
+        """Time the size of a file must not change for it to be considered complete. Seconds."""
+        self.poll_interval = poll_interval
+        """Maximum time :py:meth:`poll` waits. Seconds."""
+        self.suffixes = frozenset(x.lower() for x in suffixes) if suffixes else None
+        """File name suffixes to accept. ``None`` to accept all files."""
+        self._pending: dict[Path, tuple[int, float]] = {}
+        self._seen: set[Path] = set()
+        self._inotify: _Inotify | None
+        try:
+            self._inotify = _Inotify(self.directory)
+        except (AttributeError, OSError):
+            self._inotify = None  # Fall back to polling the directory.
+        self._scan()
+
+    def _wanted(self, path: Path) -> bool:
+        return not path.name.startswith('.') and (self.suffixes is None
+                                                  or path.suffix.lower() in self.suffixes)
+
+    def _scan(self) -> None:
+        present = set()
+        now = monotonic()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                path = Path(entry.path)
+                if not entry.is_file() or not self._wanted(path):
+                    continue
+                present.add(path)
+                if path not in self._seen and path not in self._pending:
+                    with suppress(FileNotFoundError):
+                        self._pending[path] = (entry.stat().st_size, now)
+        self._seen &= present  # Forget files that have been removed.
+
+    def poll(self) -> list[Path]:
+        """
+        Wait for files to become ready.
+
+        Returns
+        -------
+        list[Path]
+            Files that are ready, possibly none.
+        """
+        ready: dict[Path, None] = {}
+        if self._inotify is not None:
+            for name in self._inotify.read(self.poll_interval):
+                if self._wanted(path := self.directory / name):
+                    self._pending.pop(path, None)
+                    ready[path] = None
+        else:
+            sleep(self.poll_interval)
+            self._scan()
+        now = monotonic()
+        for path, (size, since) in tuple(self._pending.items()):
+            try:
+                current = path.stat().st_size
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            if current != size:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle_time:
+                del self._pending[path]
+                ready[path] = None
+        if self._inotify is None:
+            self._seen.update(ready)
+        return list(ready)
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+def _parse_journal_line(line: str) -> JournalEntryDict | None:
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict) or not entry.keys() >= {'file', 'mtime_ns', 'size'}:
+        return None
+    return cast('JournalEntryDict', entry)
+
+
+class StateJournal:
+    """
+    Append-only JSON lines record of processed files.
+
+    A file is considered processed if it has an entry and its size and modification time have not
+    changed since. Lines that cannot be decoded, such as a line cut short by a crash, are ignored.
+
+    Parameters
+    ----------
+    path : str | Path
+        Journal file. It is created if it does not exist.
+    """
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        """Journal file."""
+        self._entries: dict[str, JournalEntryDict] = {}
+        self._lock = threading.Lock()
+        with suppress(FileNotFoundError), self.path.open(encoding='utf-8') as f:
+            for line in f:
+                if (entry := _parse_journal_line(line)) is not None:
+                    self._entries[entry['file']] = entry
+
+    def is_processed(self, path: Path) -> bool:
+        """
+        Check if a file has already been processed.
+
+        Parameters
+        ----------
+        path : Path
+            Input file.
+
+        Returns
+        -------
+        bool
+            ``True`` if the file has an entry matching its current size and modification time.
+        """
+        if (entry := self._entries.get(str(path))) is None:
+            return False
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return True
+        return entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+
+    def record(self, path: Path, stat: os.stat_result, status: JournalStatus, output: Path) -> None:
+        """
+        Add an entry and write it to the journal file.
+
+        Parameters
+        ----------
+        path : Path
+            Input file.
+        stat : os.stat_result
+            Status of the input file when processing started.
+        status : JournalStatus
+            Result.
+        output : Path
+            Output file.
+        """
+        entry: JournalEntryDict = {
+            'file': str(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'output': str(output),
+            'size': stat.st_size,
+            'status': status,
+            'time': time()
+        }
+        with self._lock:
+            self._entries[entry['file']] = entry
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def _discard_message(percent: float, fr_cnt: int, total_frames: int, elapsed: float) -> None:
+    pass
+
+
+class HotFolder:
+    """
+    Transcode files as they arrive in a directory.
+
+    Ready files reported by a :py:class:`DirectoryWatcher` are passed to
+    :py:func:`ffmpeg_progress.lib.start` by a pool of ``jobs`` threads, so the cost of starting
+    Python is only paid once. Each worker slot can be pinned to its own set of CPUs with
+    :py:func:`ffmpeg_progress.launcher.cpu_slice`. Files with an entry in the
+    :py:class:`StateJournal` are skipped, so restarting does not process files again. Files that
+    fail are recorded as failed and are not retried until they change.
+
+    Parameters
+    ----------
+    directory : str | Path
+        Directory to watch.
+    output_dir : str | Path
+        Directory to write output files to. Must not be ``directory``.
+    journal_path : str | Path | None
+        State journal. Defaults to ``.ffmpeg-progress-journal.jsonl`` in ``directory``.
+    extension : str | None
+        Extension of output files, such as ``.mkv``. Defaults to the extension of the input file.
+    jobs : int
+        Number of concurrent encodes.
+    make_ffmpeg_func : Callable[[int], FFMPEGCallingFunction] | None
+        Function that gets the ffmpeg callback for a worker slot index. Defaults to
+        :py:func:`ffmpeg_progress.launcher.launch_ffmpeg`, pinned to the CPUs of the slot if
+        ``jobs`` is greater than 1.
+    report : bool
+        Push progress of each file to the progress daemon.
+    socket_path : str | Path | None
+        Progress daemon socket path.
+    on_started : Callable[[Path, Path], None] | None
+        Called with the input and output files when processing of a file starts.
+    on_finished : Callable[[Path, str | None], None] | None
+        Called with the input file and an error message (or ``None`` on success) when processing of
+        a file finishes.
+    settle_time : float
+        Passed to :py:class:`DirectoryWatcher`.
+    suffixes : Iterable[str] | None
+        Passed to :py:class:`DirectoryWatcher`.
+    wait_time : float
+        Passed to :py:func:`ffmpeg_progress.lib.start`.
+    initial_wait_time : float
+        Passed to :py:func:`ffmpeg_progress.lib.start`. A long-lived process does not need to wait
+        for ffmpeg to start before polling the statistics file.
+
+    Raises
+    ------
+    ValueError
+        If ``output_dir`` is ``directory``.
+    """
+    def __init__(self,
+                 directory: str | Path,
+                 output_dir: str | Path,
+                 journal_path: str | Path | None = None,
+                 extension: str | None = None,
+                 jobs: int = 1,
+                 make_ffmpeg_func: Callable[[int], FFMPEGCallingFunction] | None = None,
+                 *,
+                 report: bool = False,
+                 socket_path: str | Path | None = None,
+                 on_started: Callable[[Path, Path], None] | None = None,
+                 on_finished: Callable[[Path, str | None], None] | None = None,
+                 settle_time: float = 5.0,
+                 suffixes: Iterable[str] | None = None,
+                 wait_time: float = 1.0,
+                 initial_wait_time: float = 0.0) -> None:
+        self.directory = Path(directory).resolve()
+        """Directory being watched."""
+        self.output_dir = Path(output_dir).resolve()
+        """Directory output files are written to."""
+        if self.output_dir == self.directory:
+            msg = 'The output directory must not be the watched directory.'
+            raise ValueError(msg)
+        self.journal = StateJournal(journal_path
+                                    or self.directory / '.ffmpeg-progress-journal.jsonl')
+        """State journal."""
+        self.extension = f'.{extension.lstrip(".")}' if extension else None
+        """Extension of output files. ``None`` to keep the extension of the input file."""
+        self.jobs = jobs
+        """Number of concurrent encodes."""
+        self.report = report
+        """Whether progress is pushed to the progress daemon."""
+        self.socket_path = socket_path
+        """Progress daemon socket path."""
+        self.settle_time = settle_time
+        """Time the size of a file must not change for it to be considered complete. Seconds."""
+        self.suffixes = suffixes
+        """File name suffixes to accept."""
+        self.wait_time = wait_time
+        """Wait time between progress messages. Seconds."""
+        self.initial_wait_time = initial_wait_time
+        """Wait time before processing the statistics file. Seconds."""
+        self._make_ffmpeg_func = make_ffmpeg_func or self._default_ffmpeg_func
+        self._on_started = on_started
+        self._on_finished = on_finished
+        self._slots: SimpleQueue[int] = SimpleQueue()
+        for slot in range(jobs):
+            self._slots.put(slot)
+        self._in_flight: set[Path] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='ffmpeg-progress')
+
+    def _default_ffmpeg_func(self, slot: int) -> FFMPEGCallingFunction:
+        cpus = cpu_slice(slot, self.jobs) if self.jobs > 1 else None
+
+        def ffmpeg(in_file: str | Path, outfile: str | Path, vstats_path: str) -> sp.Popen[bytes]:
+            return launch_ffmpeg(in_file, outfile, vstats_path, cpus=cpus)
+
+        return ffmpeg
+
+    def output_path(self, in_file: Path) -> Path:
+        """
+        Get the output file of an input file.
+
+        Parameters
+        ----------
+        in_file : Path
+            Input file.
+
+        Returns
+        -------
+        Path
+            Output file.
+        """
+        return self.output_dir / f'{in_file.stem}{self.extension or in_file.suffix}'
+
+    def submit(self, in_file: Path) -> Future[None] | None:
+        """
+        Queue a file for processing unless it is already processed or queued.
+
+        Parameters
+        ----------
+        in_file : Path
+            Input file.
+
+        Returns
+        -------
+        Future[None] | None
+            The future of the task, or ``None`` if the file was skipped.
+        """
+        with self._lock:
+            if in_file in self._in_flight or self.journal.is_processed(in_file):
+                return None
+            self._in_flight.add(in_file)
+        return self._executor.submit(self.process, in_file)
+
+    def process(self, in_file: Path) -> None:
+        """
+        Transcode a file and record the result in the journal.
+
+        Any error is passed to the ``on_finished`` callback instead of being raised so that one
+        file cannot stop the processing of others.
+
+        Parameters
+        ----------
+        in_file : Path
+            Input file.
+        """
+        slot = self._slots.get()
+        try:
+            error = self._process(in_file, slot)
+        finally:
+            self._slots.put(slot)
+            with self._lock:
+                self._in_flight.discard(in_file)
+        if self._on_finished:
+            self._on_finished(in_file, error)
+
+    def _process(self, in_file: Path, slot: int) -> str | None:
+        outfile = self.output_path(in_file)
+        try:
+            stat = in_file.stat()
+        except FileNotFoundError:
+            return 'File was removed.'
+        except OSError as e:
+            return str(e)
+        try:
+            if self._on_started:
+                self._on_started(in_file, outfile)
+            error = self._run(in_file, outfile, self._make_ffmpeg_func(slot))
+        except Exception as e:  # noqa: BLE001
+            error = str(e) or type(e).__name__
+        try:
+            self.journal.record(in_file, stat, 'failed' if error else 'done', outfile)
+        except OSError as e:
+            return error or f'Cannot write to the journal: {e}'
+        return error
+
+    def _run(self, in_file: Path, outfile: Path, ffmpeg_func: FFMPEGCallingFunction) -> str | None:
+        launched: list[int | sp.Popen[bytes]] = []
+        vstats_paths: list[str] = []
+
+        def ffmpeg(in_file: str | Path, outfile: str | Path,
+                   vstats_path: str) -> int | sp.Popen[bytes]:
+            # Record the path first so it is removed even if ffmpeg cannot be started.
+            vstats_paths.append(vstats_path)
+            ret = ffmpeg_func(in_file, outfile, vstats_path)
+            launched.append(ret)
+            return ret
+
+        on_message: OnMessageCallback = _discard_message
+        on_done: Callable[[], None] | None = None
+        if self.report:
+            reporter = ProgressReporter(in_file, socket_path=self.socket_path)
+            on_message = reporter.on_message
+            on_done = reporter.on_done
+        try:
+            start(in_file,
+                  outfile,
+                  ffmpeg,
+                  initial_wait_time=self.initial_wait_time,
+                  on_done=on_done,
+                  on_message=on_message,
+                  wait_time=self.wait_time)
+        except (FFMPEGProgressError, OSError) as e:
+            return str(e)
+        finally:
+            for vstats_path in vstats_paths:
+                Path(vstats_path).unlink(missing_ok=True)
+        for ret in launched:
+            if isinstance(ret, sp.Popen) and ret.returncode:
+                return f'ffmpeg exited with status {ret.returncode}.'
+        return None
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """
+        Watch the directory and process files until ``stop`` is set or an exception is raised.
+
+        Queued files are cancelled and running encodes are waited for before returning.
+
+        Parameters
+        ----------
+        stop : threading.Event | None
+            Event to stop watching.
+        """
+        watcher = DirectoryWatcher(self.directory,
+                                   settle_time=self.settle_time,
+                                   suffixes=self.suffixes)
+        try:
+            while stop is None or not stop.is_set():
+                for path in watcher.poll():
+                    self.submit(path)
+        finally:
+            watcher.close()
+            self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+import json
+import socket
+
+from ffmpeg_progress.daemon import (
+    ProgressDaemon,
+    ProgressReporter,
+    default_socket_path,
+    query_status,
+)
+from ffmpeg_progress.exceptions import DaemonRunning, InsecureSocketDirectory, NotASocket
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+def test_default_socket_path_runtime_dir(mocker: MockerFixture) -> None:
+    mocker.patch.dict('os.environ', {'XDG_RUNTIME_DIR': '/run/user/1000'})
+    assert default_socket_path() == Path('/run/user/1000/ffmpeg-progress.sock')
+
+
+def test_default_socket_path_temp_dir(tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch.dict('os.environ', clear=True)
+    mocker.patch('ffmpeg_progress.daemon.gettempdir', return_value=str(tmp_path))
+    directory = tmp_path / 'ffmpeg-progress-1000'
+    mocker.patch('ffmpeg_progress.daemon.os.getuid', return_value=1000)
+    mocker.patch('ffmpeg_progress.daemon.Path.lstat',
+                 return_value=mocker.Mock(st_mode=0o40700, st_uid=1000))
+    assert default_socket_path() == directory / 'ffmpeg-progress.sock'
+    assert directory.is_dir()
+
+
+def test_default_socket_path_temp_dir_insecure(tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch.dict('os.environ', clear=True)
+    mocker.patch('ffmpeg_progress.daemon.gettempdir', return_value=str(tmp_path))
+    mocker.patch('ffmpeg_progress.daemon.os.getuid', return_value=1000)
+    mocker.patch('ffmpeg_progress.daemon.Path.lstat',
+                 return_value=mocker.Mock(st_mode=0o40777, st_uid=1000))
+    with pytest.raises(InsecureSocketDirectory):
+        default_socket_path()
+
+
+def test_reporter_batches(mocker: MockerFixture) -> None:
+    mock_socket = mocker.patch('ffmpeg_progress.daemon.socket.socket')
+    mock_monotonic = mocker.patch('ffmpeg_progress.daemon.monotonic', side_effect=[10, 10, 10.5])
+    mock_on_message = mocker.Mock()
+    mock_on_done = mocker.Mock()
+    reporter = ProgressReporter('a.mp4',
+                                'test.sock',
+                                job_id='job',
+                                on_done=mock_on_done,
+                                on_message=mock_on_message)
+
+    reporter.on_message(10.0, 1, 10, 1.0)
+    reporter.on_message(20.0, 2, 10, 2.0)
+
+    mock_socket.return_value.setblocking.assert_called_once_with(False)  # noqa: FBT003
+    mock_socket.return_value.sendto.assert_called_once_with(
+        b'[["job","a.mp4",10.0,1,10,1.0,false]]', 'test.sock')
+    assert mock_on_message.call_count == 2
+
+    mock_monotonic.side_effect = [11]
+    reporter.on_done()
+
+    sent = json.loads(mock_socket.return_value.sendto.call_args.args[0])
+    assert sent == [['job', 'a.mp4', 20.0, 2, 10, 2.0, False],
+                    ['job', 'a.mp4', 20.0, 2, 10, 2.0, True]]
+    mock_socket.return_value.close.assert_called_once()
+    mock_on_done.assert_called_once()
+
+
+def test_reporter_drops_on_error(mocker: MockerFixture) -> None:
+    mock_socket = mocker.patch('ffmpeg_progress.daemon.socket.socket')
+    mock_socket.return_value.sendto.side_effect = BlockingIOError
+    reporter = ProgressReporter('a.mp4', 'test.sock', flush_interval=0)
+    reporter.on_message(10.0, 1, 10, 1.0)
+    reporter.flush()
+    mock_socket.return_value.sendto.assert_called_once()
+
+
+def test_daemon_handle_and_prune(mocker: MockerFixture) -> None:
+    mock_time = mocker.patch('ffmpeg_progress.daemon.time', return_value=100.0)
+    daemon = ProgressDaemon('test.sock', done_linger=5, expire_after=30)
+
+    assert daemon.handle(
+        b'[["a","a.mp4",10.0,1,10,1.0,false],["b","b.mp4",1.0,1,100,1.0,true]]') is None
+    assert daemon.handle(b'not json') is None
+    assert daemon.handle(b'[1]') is None
+    assert daemon.handle(b'[["c","c.mp4","x",1,2,3,false]]') is None
+    assert daemon.handle(b'[["d","d.mp4",1.0,1.5,2,3,false]]') is None
+    assert daemon.handle(b'[["e","e.mp4",1.0,1,2,3,0]]') is None
+    assert set(daemon.jobs) == {'a', 'b'}
+    assert json.loads(daemon.handle(b'status') or b'')['a'] == {
+        'done': False,
+        'elapsed': 1.0,
+        'file': 'a.mp4',
+        'frames': 1,
+        'percent': 10.0,
+        'total_frames': 10,
+        'updated': 100.0
+    }
+
+    mock_time.return_value = 110.0
+    daemon.prune()
+    assert set(daemon.jobs) == {'a'}
+    mock_time.return_value = 140.0
+    daemon.prune()
+    assert not daemon.jobs
+
+
+def test_serve_forever(tmp_path: Path, mocker: MockerFixture) -> None:
+    mock_socket = mocker.patch('ffmpeg_progress.daemon.socket.socket')
+    sock = mock_socket.return_value.__enter__.return_value
+    sock.recvfrom.side_effect = [(b'[["a","a.mp4",50.0,5,10,1.0,false]]', None),
+                                 (b'status', 'client-1'), (b'status', 'client-2'), TimeoutError,
+                                 KeyboardInterrupt]
+    sock.sendto.side_effect = [None, None, ConnectionRefusedError]
+    socket_path = tmp_path / 'test.sock'
+    daemon = ProgressDaemon(socket_path)
+
+    with pytest.raises(KeyboardInterrupt):
+        daemon.serve_forever()
+
+    sock.bind.assert_called_once_with(str(socket_path))
+    assert json.loads(bytes(sock.sendto.call_args_list[0].args[0]))['a']['percent'] == 50.0
+    assert sock.sendto.call_args_list[1].args == (b'', 'client-1')
+    assert sock.sendto.call_args_list[2].args[1] == 'client-2'
+
+
+def test_serve_forever_running(tmp_path: Path) -> None:
+    socket_path = tmp_path / 'test.sock'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.bind(str(socket_path))
+        with pytest.raises(DaemonRunning):
+            ProgressDaemon(socket_path).serve_forever()
+
+
+def test_serve_forever_stale_socket(tmp_path: Path, mocker: MockerFixture) -> None:
+    socket_path = tmp_path / 'test.sock'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.bind(str(socket_path))
+    daemon = ProgressDaemon(socket_path)
+    mocker.patch.object(daemon, '_serve_once', side_effect=KeyboardInterrupt)
+    with pytest.raises(KeyboardInterrupt):
+        daemon.serve_forever()
+    assert not socket_path.exists()
+
+
+def test_serve_forever_not_a_socket(tmp_path: Path) -> None:
+    socket_path = tmp_path / 'test.txt'
+    socket_path.write_text('data')
+    with pytest.raises(NotASocket):
+        ProgressDaemon(socket_path).serve_forever()
+    assert socket_path.read_text() == 'data'
+
+
+def test_query_status(mocker: MockerFixture) -> None:
+    mock_socket = mocker.patch('ffmpeg_progress.daemon.socket.socket')
+    sock = mock_socket.return_value.__enter__.return_value
+    sock.recv.side_effect = [
+        b'{"a":{"done":false,"elapsed":1.0,"file":"a.mp4",',
+        b'"frames":1,"percent":10.0,"total_frames":10,"updated":100.0}}', b''
+    ]
+    assert query_status('test.sock', timeout=1.0) == {
+        'a': {
+            'done': False,
+            'elapsed': 1.0,
+            'file': 'a.mp4',
+            'frames': 1,
+            'percent': 10.0,
+            'total_frames': 10,
+            'updated': 100.0
+        }
+    }
+    sock.bind.assert_called_once_with('')
+    sock.settimeout.assert_called_once_with(1.0)
+    sock.sendto.assert_called_once_with(b'status', 'test.sock')
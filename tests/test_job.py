@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from ffmpeg_progress.job import Job
+import pytest
+
+
+def test_job_pass_incomplete() -> None:
+    job = Job(100, outputs=2)
+    job.update(0, 100)
+    assert not job.pass_complete
+
+
+def test_job_single_pass() -> None:
+    job = Job(100)
+    assert job.update(0, 50)
+    assert not job.update(0, 40)
+    assert job.frames == 50
+    assert job.total_frames == 100
+    assert job.percent == 50.0
+    job.update(0, 100)
+    assert job.pass_complete
+    job.next_pass()
+    assert job.done
+    assert job.pass_complete
+    assert not job.update(0, 200)
+    job.next_pass()
+    assert job.pass_index == 1
+
+
+def test_job_passes_and_outputs() -> None:
+    job = Job((100, 50), passes=2, pass_weights=(1, 3), output_weights=(3, 1))
+    assert job.passes == 2
+    assert job.outputs == 2
+    assert job.total_frames == 300
+    job.update(0, 100)
+    assert job.percent == 18.75
+    assert not job.update(2, 10)
+    job.update(1, 50)
+    assert job.pass_complete
+    assert job.percent == 25.0
+    job.next_pass()
+    assert job.pass_index == 1
+    assert job.frames == 150
+    job.update(1, 25)
+    assert job.percent == pytest.approx(34.375)
+
+
+def test_job_next_pass_keeps_progress() -> None:
+    job = Job(100, passes=2, outputs=3)
+    job.update(0, 10)
+    job.next_pass()
+    assert job.frames == 300
+    assert job.percent == 50.0
+    assert job.elapsed >= 0
+
+
+@pytest.mark.parametrize(('args', 'kwargs'), [((100,), {
+    'passes': 0
+}), ((100,), {
+    'outputs': 0
+}), (((100, 0),), {}), ((100,), {
+    'pass_weights': (1, 1)
+}), ((100,), {
+    'output_weights': (-1,)
+}), ((100,), {
+    'pass_weights': (0,)
+})])
+def test_job_invalid(args: tuple[int], kwargs: dict[str, int]) -> None:
+    with pytest.raises(ValueError):  # noqa: PT011
+        Job(*args, **kwargs)  # type: ignore[arg-type]
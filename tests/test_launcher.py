@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ffmpeg_progress.exceptions import LaunchFailed
+from ffmpeg_progress.launcher import cpu_slice, launch_ffmpeg
+import psutil
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+@pytest.mark.parametrize(('job_index', 'jobs', 'expected'), [(0, 1, (0, 1, 2, 3, 4)),
+                                                             (0, 2, (0, 1, 2)), (1, 2, (3, 4)),
+                                                             (0, 5, (0,)), (4, 5, (4,)),
+                                                             (6, 8, (1,))])
+def test_cpu_slice(job_index: int, jobs: int, expected: tuple[int, ...]) -> None:
+    assert cpu_slice(job_index, jobs, (4, 3, 2, 1, 0)) == expected
+
+
+def test_cpu_slice_default_cpus(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.launcher.os.sched_getaffinity', return_value={2, 3})
+    assert cpu_slice(1, 2) == (3,)
+
+
+def test_cpu_slice_invalid_index() -> None:
+    with pytest.raises(ValueError, match='Job index'):
+        cpu_slice(2, 2, (0, 1))
+
+
+def test_launch_ffmpeg(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.launcher.shutil.which', return_value='/usr/bin/ffmpeg')
+    mock_popen = mocker.patch('ffmpeg_progress.launcher.sp.Popen')
+    mock_popen.return_value.pid = 123
+    mock_setaffinity = mocker.patch('ffmpeg_progress.launcher.os.sched_setaffinity')
+    mock_setpriority = mocker.patch('ffmpeg_progress.launcher.os.setpriority')
+    mock_process = mocker.patch('ffmpeg_progress.launcher.psutil.Process')
+    mock_process.return_value.threads.return_value = []
+
+    process = launch_ffmpeg('in.mp4',
+                            'out.mp4',
+                            'vstats', ('-c:v', 'libx264'),
+                            cpus=(2, 3),
+                            ionice_class='best-effort',
+                            ionice_value=4,
+                            nice=10)
+
+    assert process is mock_popen.return_value
+    mock_popen.assert_called_once_with(
+        ('/usr/bin/ffmpeg', '-nostats', '-loglevel', '0', '-y', '-vstats_file', 'vstats', '-i',
+         'in.mp4', '-threads', '2', '-c:v', 'libx264', 'out.mp4'),
+        close_fds=False)
+    mock_setaffinity.assert_called_once_with(123, (2, 3))
+    mock_setpriority.assert_called_once_with(mocker.ANY, 123, 10)
+    mock_process.return_value.ionice.assert_called_once_with(psutil.IOPRIO_CLASS_BE, 4)
+
+
+def test_launch_ffmpeg_idle_no_limits(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.launcher.shutil.which', return_value=None)
+    mock_popen = mocker.patch('ffmpeg_progress.launcher.sp.Popen')
+    mock_setaffinity = mocker.patch('ffmpeg_progress.launcher.os.sched_setaffinity')
+    mock_setpriority = mocker.patch('ffmpeg_progress.launcher.os.setpriority')
+    mock_process = mocker.patch('ffmpeg_progress.launcher.psutil.Process')
+    mock_process.return_value.threads.return_value = []
+
+    launch_ffmpeg('in.mp4', 'out.mp4', 'vstats', ionice_class='idle', ionice_value=4)
+
+    mock_popen.assert_called_once_with(('ffmpeg', '-nostats', '-loglevel', '0', '-y',
+                                        '-vstats_file', 'vstats', '-i', 'in.mp4', 'out.mp4'),
+                                       close_fds=False)
+    mock_setaffinity.assert_not_called()
+    mock_setpriority.assert_not_called()
+    mock_process.return_value.ionice.assert_called_once_with(psutil.IOPRIO_CLASS_IDLE, None)
+
+
+def test_launch_ffmpeg_every_thread(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.launcher.sys.platform', 'linux')
+    mock_popen = mocker.patch('ffmpeg_progress.launcher.sp.Popen')
+    mock_popen.return_value.pid = 123
+    mock_setaffinity = mocker.patch('ffmpeg_progress.launcher.os.sched_setaffinity',
+                                    side_effect=[None, None, ProcessLookupError])
+    mock_process = mocker.patch('ffmpeg_progress.launcher.psutil.Process')
+    mock_process.return_value.threads.return_value = [
+        mocker.Mock(id=123), mocker.Mock(id=124),
+        mocker.Mock(id=125)
+    ]
+
+    launch_ffmpeg('in.mp4', 'out.mp4', 'vstats', cpus=(0,))
+
+    assert mock_setaffinity.call_args_list == [
+        mocker.call(123, (0,)),
+        mocker.call(124, (0,)),
+        mocker.call(125, (0,))
+    ]
+
+
+def test_launch_ffmpeg_other_platform(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.launcher.sys.platform', 'darwin')
+    mocker.patch('ffmpeg_progress.launcher.sp.Popen')
+    mock_setpriority = mocker.patch('ffmpeg_progress.launcher.os.setpriority')
+    mock_process = mocker.patch('ffmpeg_progress.launcher.psutil.Process')
+
+    launch_ffmpeg('in.mp4', 'out.mp4', 'vstats', nice=5)
+
+    mock_setpriority.assert_called_once()
+    mock_process.return_value.threads.assert_not_called()
+
+
+@pytest.mark.parametrize('error', [
+    PermissionError(1, 'Operation not permitted'),
+    psutil.AccessDenied(),
+    ValueError('value not in 0-7 range')
+])
+def test_launch_ffmpeg_limits_failed(mocker: MockerFixture, error: Exception) -> None:
+    mock_popen = mocker.patch('ffmpeg_progress.launcher.sp.Popen')
+    mocker.patch('ffmpeg_progress.launcher.os.setpriority')
+    mocker.patch('ffmpeg_progress.launcher.psutil.Process').return_value.ionice.side_effect = error
+
+    with pytest.raises(LaunchFailed, match='Cannot apply resource limits'):
+        launch_ffmpeg('in.mp4', 'out.mp4', 'vstats', ionice_class='realtime', nice=-5)
+
+    mock_popen.return_value.kill.assert_called_once()
+    mock_popen.return_value.wait.assert_called_once()
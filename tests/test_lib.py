@@ -7,6 +7,7 @@ import subprocess as sp
 
 from ffmpeg_progress.constants import LINESEP_BYTES
 from ffmpeg_progress.exceptions import (
+    FFMPEGFailed,
     InvalidFPS,
     InvalidPID,
     NoDuration,
@@ -14,7 +15,9 @@ from ffmpeg_progress.exceptions import (
     TotalFramesLTEZero,
     UnexpectedZeroFPS,
 )
-from ffmpeg_progress.lib import display, ffprobe, start
+from ffmpeg_progress.job import Job
+from ffmpeg_progress.lib import display, display_job, ffprobe, start, start_job
+from ffmpeg_progress.tracing import Tracer
 import psutil
 import pytest
 
@@ -113,6 +116,34 @@ def test_start_invalid_pid(mocker: MockerFixture) -> None:
         start('input.mp4', 'output.mp4', mock_ffmpeg_func)
 
 
+def test_start_probe_failed(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.lib.sp.check_output',
+                 side_effect=sp.CalledProcessError(1, 'ffprobe'))
+    mock_ffmpeg_func = mocker.Mock()
+
+    with pytest.raises(ProbeFailed):
+        start('input.mp4', 'output.mp4', mock_ffmpeg_func)
+    mock_ffmpeg_func.assert_not_called()
+
+
+def test_start_ffmpeg_func_raises(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.lib.ffprobe',
+                 return_value={
+                     'streams': [{
+                         'avg_frame_rate': '25/1'
+                     }],
+                     'format': {
+                         'duration': '10'
+                     }
+                 })
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mock_os_close = mocker.patch('ffmpeg_progress.lib.os.close')
+
+    with pytest.raises(FileNotFoundError):
+        start('input.mp4', 'output.mp4', mocker.Mock(side_effect=FileNotFoundError))
+    mock_os_close.assert_called_once_with(123)
+
+
 def test_start_success(mocker: MockerFixture) -> None:
     mock_ffprobe = mocker.patch('ffmpeg_progress.lib.ffprobe')
     mock_ffprobe.return_value = {
@@ -139,25 +170,32 @@ def test_start_success(mocker: MockerFixture) -> None:
     mock_on_done.assert_called_once()
 
 
-def test_display_success(mocker: MockerFixture) -> None:
+def test_display_success(mocker: MockerFixture, tmp_path: Path) -> None:
     mock_os_kill = mocker.patch('ffmpeg_progress.lib.os.kill')
     mock_psutil_process = mocker.patch('ffmpeg_progress.lib.psutil.Process')
     mock_psutil_process.return_value.status.return_value = psutil.STATUS_RUNNING
-    mock_os_lseek = mocker.patch('ffmpeg_progress.lib.os.lseek', side_effect=[-2, -2, 0])
-    mock_os_read = mocker.patch(
-        'ffmpeg_progress.lib.os.read',
-        side_effect=[LINESEP_BYTES, b'frame=  10', LINESEP_BYTES, b'0 0 0 0 0 100'])
-    mock_sleep = mocker.patch('ffmpeg_progress.lib.sleep')
+    vstats = tmp_path / 'vstats'
+    vstats.touch()
+    data = _vstats_lines(1, range(1, 101))
+    # Lines are the same length. The second tick sees 40 complete lines and a partial line.
+    cut = 40 * (len(data) // 100) + 60
+    writes = iter((b'', data[:cut], data[cut:]))
+    mock_sleep = mocker.patch('ffmpeg_progress.lib.sleep',
+                              side_effect=lambda _: _append(vstats, next(writes)))
     mock_on_message = mocker.Mock()
-
-    display(100, 123, 456, mock_on_message, 0.1)
+    fd = os.open(vstats, os.O_RDONLY)
+    try:
+        display(100, fd, 456, mock_on_message, 0.1)
+    finally:
+        os.close(fd)
 
     mock_os_kill.assert_called_with(456, 0)
     mock_psutil_process.assert_called_with(456)
-    mock_os_lseek.assert_any_call(123, -2, os.SEEK_END)
-    mock_os_read.assert_any_call(123, 1)
-    mock_on_message.assert_called_with(100.0, 100, 100, mocker.ANY)
-    mock_sleep.assert_called()
+    assert mock_on_message.call_args_list == [
+        mocker.call(40.0, 40, 100, mocker.ANY),
+        mocker.call(100.0, 100, 100, mocker.ANY)
+    ]
+    assert mock_sleep.call_count == 3
 
 
 def test_display_process_terminated(mocker: MockerFixture) -> None:
@@ -187,26 +225,28 @@ def test_display_zombie_process(mocker: MockerFixture) -> None:
     mock_sleep.assert_called()
 
 
-def test_display_invalid_vstats_line(mocker: MockerFixture) -> None:
+def test_display_invalid_vstats_line(mocker: MockerFixture, tmp_path: Path) -> None:
     mock_os_kill = mocker.patch('os.kill')
     mock_psutil_process = mocker.patch('psutil.Process')
     mock_psutil_process.return_value.status.return_value = psutil.STATUS_RUNNING
-    mock_os_lseek = mocker.patch('os.lseek', side_effect=[-2, -2, 0, -2, -2, 0])
-    mock_os_read = mocker.patch('os.read',
-                                side_effect=[
-                                    b'invalid line', LINESEP_BYTES, b'invalid line',
-                                    b'0 0 0 0 0 100', LINESEP_BYTES, b'0 0 0 0 0 100'
-                                ])
-    mock_sleep = mocker.patch('ffmpeg_progress.lib.sleep')
+    vstats = tmp_path / 'vstats'
+    vstats.touch()
+    writes = iter((b'invalid line' + LINESEP_BYTES,
+                   b'0 0 0 0 0 100' + LINESEP_BYTES + _vstats_lines(1, range(100, 101))))
+    mock_sleep = mocker.patch('ffmpeg_progress.lib.sleep',
+                              side_effect=lambda _: _append(vstats, next(writes)))
     mock_on_message = mocker.Mock()
-
-    display(100, 123, 456, on_message=mock_on_message, wait_time=0.1)
+    fd = os.open(vstats, os.O_RDONLY)
+    try:
+        display(100, fd, 456, on_message=mock_on_message, wait_time=0.1)
+    finally:
+        os.close(fd)
 
     mock_os_kill.assert_called_with(456, 0)
     mock_psutil_process.assert_called_with(456)
-    mock_os_lseek.assert_any_call(123, -2, os.SEEK_END)
-    mock_os_read.assert_any_call(123, 1)
     assert mock_on_message.call_count == 2
+    mock_on_message.assert_any_call(0.0, 0, 100, mocker.ANY)
+    mock_on_message.assert_called_with(100.0, 100, 100, mocker.ANY)
     mock_sleep.assert_called()
 
 
@@ -223,3 +263,300 @@ def test_start_invalid_stream_index(mocker: MockerFixture) -> None:
 
     with pytest.raises(ProbeFailed):
         start('input.mp4', 'output.mp4', lambda _x, _y, _z: 123, index=5)
+
+
+def test_start_popen(mocker: MockerFixture) -> None:
+    mock_ffprobe = mocker.patch('ffmpeg_progress.lib.ffprobe')
+    mock_ffprobe.return_value = {
+        'streams': [{
+            'avg_frame_rate': '25/1'
+        }],
+        'format': {
+            'duration': '10'
+        }
+    }
+    mock_mkstemp = mocker.patch('ffmpeg_progress.lib.mkstemp')
+    mock_mkstemp.return_value = (123, 'vstats_path')
+    mock_process = mocker.Mock(spec=sp.Popen, pid=456)
+    mock_display = mocker.patch('ffmpeg_progress.lib.display')
+    mocker.patch('os.close')
+    mocker.patch('ffmpeg_progress.lib.sleep')
+
+    start('input.mp4', 'output.mp4', mocker.Mock(return_value=mock_process))
+
+    mock_display.assert_called_once_with(250,
+                                         123,
+                                         456,
+                                         on_message=None,
+                                         process=mock_process,
+                                         tracer=None,
+                                         wait_time=1.0)
+    mock_process.wait.assert_called_once()
+
+
+def test_start_history(mocker: MockerFixture) -> None:
+    mock_ffprobe = mocker.patch('ffmpeg_progress.lib.ffprobe')
+    mock_ffprobe.return_value = {
+        'streams': [{
+            'avg_frame_rate': '25/1'
+        }],
+        'format': {
+            'duration': '10'
+        }
+    }
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mocker.patch('ffmpeg_progress.lib.display')
+    mocker.patch('os.close')
+    mocker.patch('ffmpeg_progress.lib.sleep')
+    mock_iter_vstats_records = mocker.patch('ffmpeg_progress.lib.iter_vstats_records')
+    history = mocker.Mock()
+
+    start('input.mp4', 'output.mp4', mocker.Mock(return_value=456), history=history)
+
+    mock_iter_vstats_records.assert_called_once_with(123)
+    history.extend.assert_called_once_with(mock_iter_vstats_records.return_value)
+
+
+def test_display_process_exited(mocker: MockerFixture) -> None:
+    mock_os_kill = mocker.patch('os.kill')
+    mock_process = mocker.Mock(spec=sp.Popen)
+    mock_process.poll.return_value = 0
+    mocker.patch('ffmpeg_progress.lib.sleep')
+    mock_on_message = mocker.Mock()
+
+    display(100, 123, 456, on_message=mock_on_message, process=mock_process, wait_time=0.1)
+
+    mock_os_kill.assert_not_called()
+    mock_on_message.assert_not_called()
+
+
+def _vstats_lines(outputs: int, frames: range) -> bytes:
+    return b''.join(
+        b'out= %2d st=  0 frame= %5d q= 28.0 f_size=  1234 s_size= 10kB time= 0.040 '
+        b'br= 246.8kbits/s avg_br= 246.8kbits/s type= P' % (output, frame) + LINESEP_BYTES
+        for frame in frames for output in range(outputs))
+
+
+def _append(path: Path, data: bytes) -> None:
+    with path.open('ab') as f:
+        f.write(data)
+
+
+def test_display_job(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('ffmpeg_progress.lib.os.kill')
+    mock_psutil_process = mocker.patch('ffmpeg_progress.lib.psutil.Process')
+    mock_psutil_process.return_value.status.return_value = psutil.STATUS_RUNNING
+    vstats = tmp_path / 'vstats'
+    vstats.touch()
+    data = _vstats_lines(2, range(1, 101))
+    # ffmpeg writes a line per output for every frame. Each tick sees part of the file, ending with
+    # an incomplete line.
+    writes = iter((b'', data[:1000], data[1000:len(data) // 2], data[len(data) // 2:]))
+    mocker.patch('ffmpeg_progress.lib.sleep', side_effect=lambda _: _append(vstats, next(writes)))
+    mock_on_message = mocker.Mock()
+    job = Job((100, 100))
+    fd = os.open(vstats, os.O_RDONLY)
+    try:
+        display_job(job, fd, 456, mock_on_message, 0.1)
+    finally:
+        os.close(fd)
+
+    assert job.pass_complete
+    assert mock_on_message.call_count == 3
+    mock_on_message.assert_called_with(100.0, 200, 200, mocker.ANY)
+
+
+def test_display_job_tracer(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('ffmpeg_progress.lib.os.kill')
+    mock_psutil_process = mocker.patch('ffmpeg_progress.lib.psutil.Process')
+    mock_psutil_process.return_value.status.return_value = psutil.STATUS_RUNNING
+    vstats = tmp_path / 'vstats'
+    vstats.touch()
+    writes = iter((b'', _vstats_lines(1, range(100, 101))))
+    mocker.patch('ffmpeg_progress.lib.sleep', side_effect=lambda _: _append(vstats, next(writes)))
+    tracer = Tracer()
+    fd = os.open(vstats, os.O_RDONLY)
+    try:
+        display_job(Job(100), fd, 456, mocker.Mock(), 0.1, tracer=tracer)
+    finally:
+        os.close(fd)
+
+    summary = tracer.summary()
+    assert summary['liveness']['count'] == 2
+    assert summary['read']['count'] == 2
+    assert summary['parse']['count'] == 1
+    assert summary['on_message']['count'] == 1
+
+
+def test_display_tracer(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.lib.os.kill')
+    mock_psutil_process = mocker.patch('ffmpeg_progress.lib.psutil.Process')
+    mock_psutil_process.return_value.status.side_effect = [
+        psutil.STATUS_RUNNING, psutil.STATUS_RUNNING, psutil.STATUS_ZOMBIE
+    ]
+    mocker.patch('ffmpeg_progress.lib._read_new_lines',
+                 side_effect=[([], 0, b''),
+                              ([_vstats_lines(1, range(10, 11)).decode().strip()], 100, b'')])
+    mocker.patch('ffmpeg_progress.lib.sleep')
+    tracer = Tracer()
+
+    display(100, 123, 456, mocker.Mock(), 0.1, tracer=tracer)
+
+    summary = tracer.summary()
+    assert summary['liveness']['count'] == 3
+    assert summary['read']['count'] == 2
+    assert summary['parse']['count'] == 1
+    assert summary['on_message']['count'] == 1
+
+
+def test_start_tracer(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.lib.ffprobe',
+                 return_value={
+                     'streams': [{
+                         'avg_frame_rate': '25/1'
+                     }],
+                     'format': {
+                         'duration': '10'
+                     }
+                 })
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mocker.patch('ffmpeg_progress.lib.os.close')
+    mocker.patch('ffmpeg_progress.lib.sleep')
+    mock_display = mocker.patch('ffmpeg_progress.lib.display')
+    tracer = Tracer()
+
+    start('input.mp4', 'output.mp4', mocker.Mock(return_value=456), tracer=tracer)
+
+    assert set(tracer.summary()) == {'probe', 'initial_wait'}
+    assert mock_display.call_args.kwargs['tracer'] is tracer
+
+
+def test_start_job(mocker: MockerFixture) -> None:
+    mock_ffprobe = mocker.patch('ffmpeg_progress.lib.ffprobe')
+    mock_ffprobe.return_value = {
+        'streams': [{
+            'avg_frame_rate': '25/1'
+        }],
+        'format': {
+            'duration': '10'
+        }
+    }
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mock_ftruncate = mocker.patch('ffmpeg_progress.lib.os.ftruncate')
+    mock_os_close = mocker.patch('ffmpeg_progress.lib.os.close')
+    mocker.patch('ffmpeg_progress.lib.sleep')
+    mock_display_job = mocker.patch('ffmpeg_progress.lib.display_job')
+    mocker.patch('ffmpeg_progress.lib._is_running', return_value=False)
+    mock_process = mocker.Mock(spec=sp.Popen, pid=456)
+    mock_process.wait.return_value = 0
+    mock_ffmpeg_func = mocker.Mock(side_effect=[456, mock_process])
+    mock_on_message = mocker.Mock()
+    mock_iter_vstats_records = mocker.patch('ffmpeg_progress.lib.iter_vstats_records')
+    history = mocker.Mock()
+    tracer = Tracer()
+
+    job = start_job('input.mp4', ('a.mp4', 'b.mp4'),
+                    mock_ffmpeg_func,
+                    history=history,
+                    on_message=mock_on_message,
+                    passes=2,
+                    tracer=tracer)
+
+    assert mock_ffmpeg_func.call_args_list == [
+        mocker.call(Path('input.mp4'), ('a.mp4', 'b.mp4'), 'vstats_path', 1),
+        mocker.call(Path('input.mp4'), ('a.mp4', 'b.mp4'), 'vstats_path', 2)
+    ]
+    mock_ffprobe.assert_called_once()
+    assert mock_ftruncate.call_count == 2
+    assert mock_display_job.call_count == 2
+    mock_process.wait.assert_called_once()
+    mock_os_close.assert_called_once_with(123)
+    assert job.done
+    assert job.total_frames == 1000
+    mock_on_message.assert_called_with(100.0, 1000, 1000, mocker.ANY)
+    history.extend.assert_called_once_with(mock_iter_vstats_records.return_value)
+    summary = tracer.summary()
+    assert summary['probe']['count'] == 1
+    assert summary['initial_wait']['count'] == 2
+
+
+def test_start_job_pid_waits_for_exit(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mocker.patch('ffmpeg_progress.lib.os.ftruncate')
+    mocker.patch('ffmpeg_progress.lib.os.close')
+    mock_sleep = mocker.patch('ffmpeg_progress.lib.sleep')
+    mocker.patch('ffmpeg_progress.lib.display_job')
+    mock_is_running = mocker.patch('ffmpeg_progress.lib._is_running',
+                                   side_effect=[True, True, False, False])
+    calls: list[int] = []
+
+    def ffmpeg_func(in_file: Path, outfiles: tuple[str | Path, ...], vstats_path: str,
+                    pass_number: int) -> int:
+        # Pass 2 must only start once the first ffmpeg has exited.
+        calls.append(mock_is_running.call_count)
+        return 455 + pass_number
+
+    start_job('input.mp4', ('a.mp4',),
+              ffmpeg_func,
+              initial_wait_time=0.5,
+              on_message=mocker.Mock(),
+              output_frames=(100,),
+              passes=2,
+              wait_time=0.1)
+
+    assert calls == [0, 3]
+    assert mock_is_running.call_args_list == [
+        mocker.call(456, None),
+        mocker.call(456, None),
+        mocker.call(456, None),
+        mocker.call(457, None)
+    ]
+    assert mock_sleep.call_args_list == [
+        mocker.call(0.5), mocker.call(0.1),
+        mocker.call(0.1), mocker.call(0.5)
+    ]
+
+
+def test_start_job_ffmpeg_failed(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mocker.patch('ffmpeg_progress.lib.os.ftruncate')
+    mock_os_close = mocker.patch('ffmpeg_progress.lib.os.close')
+    mocker.patch('ffmpeg_progress.lib.sleep')
+    mocker.patch('ffmpeg_progress.lib.display_job')
+    mock_process = mocker.Mock(spec=sp.Popen, pid=456, returncode=1)
+    mock_process.wait.return_value = 1
+    mock_ffmpeg_func = mocker.Mock(return_value=mock_process)
+    mock_on_message = mocker.Mock()
+
+    with pytest.raises(FFMPEGFailed, match='status 1'):
+        start_job('input.mp4', ('a.mp4',),
+                  mock_ffmpeg_func,
+                  on_message=mock_on_message,
+                  output_frames=(100,),
+                  passes=2)
+
+    mock_ffmpeg_func.assert_called_once()
+    mock_on_message.assert_not_called()
+    mock_os_close.assert_called_once_with(123)
+
+
+def test_start_job_output_frames(mocker: MockerFixture) -> None:
+    mock_ffprobe = mocker.patch('ffmpeg_progress.lib.ffprobe')
+    mocker.patch('ffmpeg_progress.lib.mkstemp', return_value=(123, 'vstats_path'))
+    mocker.patch('ffmpeg_progress.lib.os.ftruncate')
+    mock_os_close = mocker.patch('ffmpeg_progress.lib.os.close')
+    mocker.patch('ffmpeg_progress.lib.sleep')
+
+    with pytest.raises(InvalidPID):
+        start_job('input.mp4', ('a.mp4', 'b.mp4'),
+                  mocker.Mock(return_value=0),
+                  on_message=mocker.Mock(),
+                  output_frames=(100, 50))
+
+    mock_ffprobe.assert_not_called()
+    mock_os_close.assert_called_once_with(123)
+
+
+def test_start_job_output_frames_mismatch(mocker: MockerFixture) -> None:
+    with pytest.raises(ValueError, match='one frame count per output'):
+        start_job('input.mp4', ('a.mp4', 'b.mp4'), mocker.Mock(), output_frames=(100,))
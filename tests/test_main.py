@@ -3,7 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-from ffmpeg_progress.exceptions import FFMPEGProgressError
+from ffmpeg_progress.exceptions import DaemonRunning, FFMPEGProgressError
 from ffmpeg_progress.main import main
 import pytest
 
@@ -32,7 +32,7 @@ def mock_temporary_file(mocker: MockerFixture) -> MockType:
 def test_main_success(mocker: MockerFixture, mock_start: MockType, mock_subprocess_popen: MockType,
                       mock_temporary_file: MockType, runner: CliRunner) -> None:
     mocker.patch('ffmpeg_progress.main.click.Path.convert', return_value=Path('test.mp4'))
-    mock_start.side_effect = lambda _in_file, _outfile, _ffmpeg, on_done: on_done('Done')
+    mock_start.side_effect = lambda _in_file, _outfile, _ffmpeg, on_done, **_: on_done()
     mock_subprocess_popen.return_value.pid = 1234
     result = runner.invoke(main, ['test.mp4'])
     assert result.exit_code == 0
@@ -59,3 +59,167 @@ def test_main_invalid_file(mocker: MockerFixture, mock_start: MockType,
     assert "Invalid value for 'FILE'" in result.output
     mock_start.assert_not_called()
     mock_subprocess_popen.assert_not_called()
+
+
+def test_main_jobs(mocker: MockerFixture, mock_start: MockType, mock_temporary_file: MockType,
+                   runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.click.Path.convert', return_value=Path('test.mp4'))
+    mock_cpu_slice = mocker.patch('ffmpeg_progress.main.cpu_slice', return_value=(2, 3))
+    result = runner.invoke(main, ['--jobs', '2', '--job-index', '1', '--nice', '5', 'test.mp4'])
+    assert result.exit_code == 0
+    mock_cpu_slice.assert_called_once_with(1, 2)
+    ffmpeg = mock_start.call_args.args[2]
+    assert ffmpeg.keywords['cpus'] == (2, 3)
+    assert ffmpeg.keywords['nice'] == 5
+
+
+def test_main_invalid_job_index(mocker: MockerFixture, mock_start: MockType,
+                                mock_temporary_file: MockType, runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.click.Path.convert', return_value=Path('test.mp4'))
+    result = runner.invoke(main, ['--jobs', '2', '--job-index', '2', 'test.mp4'])
+    assert result.exit_code != 0
+    assert 'Job index' in result.output
+    mock_start.assert_not_called()
+
+
+def test_main_help(runner: CliRunner) -> None:
+    result = runner.invoke(main, ['-h'])
+    assert result.exit_code == 0
+    assert 'encode' in result.output
+    assert 'status' in result.output
+
+
+def test_main_report(mocker: MockerFixture, mock_start: MockType, mock_temporary_file: MockType,
+                     runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.click.Path.convert', return_value=Path('test.mp4'))
+    mock_reporter = mocker.patch('ffmpeg_progress.main.ProgressReporter')
+    result = runner.invoke(main, ['encode', '--report', 'test.mp4'])
+    assert result.exit_code == 0
+    mock_start.assert_called_once_with(Path('test.mp4'),
+                                       mocker.ANY,
+                                       mocker.ANY,
+                                       history=None,
+                                       on_done=mock_reporter.return_value.on_done,
+                                       on_message=mock_reporter.return_value.on_message,
+                                       tracer=None)
+
+
+def test_daemon(mocker: MockerFixture, runner: CliRunner) -> None:
+    mock_daemon = mocker.patch('ffmpeg_progress.main.ProgressDaemon')
+    mock_daemon.return_value.serve_forever.side_effect = KeyboardInterrupt
+    result = runner.invoke(main, ['daemon', '--socket', 'test.sock'])
+    assert result.exit_code == 0
+    mock_daemon.assert_called_once_with(Path('test.sock'), done_linger=10.0, expire_after=60.0)
+
+
+def test_daemon_running(mocker: MockerFixture, runner: CliRunner) -> None:
+    mock_daemon = mocker.patch('ffmpeg_progress.main.ProgressDaemon')
+    mock_daemon.return_value.serve_forever.side_effect = DaemonRunning(Path('test.sock'))
+    result = runner.invoke(main, ['daemon'])
+    assert result.exit_code != 0
+    assert 'already listening' in result.output
+
+
+def test_status(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.query_status',
+                 return_value={
+                     'abcdef0123': {
+                         'done': False,
+                         'elapsed': 12.0,
+                         'file': 'a.mp4',
+                         'frames': 10,
+                         'percent': 50.0,
+                         'total_frames': 20,
+                         'updated': 0.0
+                     }
+                 })
+    result = runner.invoke(main, ['status'])
+    assert result.exit_code == 0
+    assert result.output == 'abcdef01   50.0%  10 / 20 frames  12 s  running  a.mp4\n'
+    result = runner.invoke(main, ['status', '--json'])
+    assert result.exit_code == 0
+    assert '"file": "a.mp4"' in result.output
+
+
+def test_status_no_jobs(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.query_status', return_value={})
+    result = runner.invoke(main, ['status'])
+    assert result.exit_code == 0
+    assert result.output == 'No active jobs.\n'
+
+
+def test_status_not_running(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.query_status', side_effect=FileNotFoundError)
+    result = runner.invoke(main, ['status'])
+    assert result.exit_code != 0
+    assert 'not running' in result.output
+
+
+def test_status_invalid_reply(mocker: MockerFixture, runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.query_status', side_effect=ValueError)
+    result = runner.invoke(main, ['status'])
+    assert result.exit_code != 0
+    assert 'Invalid reply' in result.output
+
+
+def test_main_summary(mocker: MockerFixture, mock_start: MockType, mock_temporary_file: MockType,
+                      runner: CliRunner) -> None:
+    mocker.patch('ffmpeg_progress.main.click.Path.convert', return_value=Path('test.mp4'))
+    result = runner.invoke(main, ['--summary', 'test.mp4'])
+    assert result.exit_code == 0
+    assert '"records": 0' in result.output
+    assert mock_start.call_args.kwargs['history'] is not None
+
+
+def test_main_trace(mock_start: MockType, mock_temporary_file: MockType, runner: CliRunner,
+                    tmp_path: Path) -> None:
+    in_file = tmp_path / 'test.mp4'
+    in_file.touch()
+    trace_path = tmp_path / 'trace.json'
+    mock_start.side_effect = lambda *_, tracer, **__: tracer.record('probe', 0, 1000)
+    result = runner.invoke(main, ['--trace', str(trace_path), str(in_file)])
+    assert result.exit_code == 0
+    assert '"probe"' in result.output
+    assert '"traceEvents"' in trace_path.read_text(encoding='utf-8')
+
+
+def test_watch(mocker: MockerFixture, runner: CliRunner, tmp_path: Path) -> None:
+    mock_hot_folder = mocker.patch('ffmpeg_progress.main.HotFolder')
+    mock_launch_ffmpeg = mocker.patch('ffmpeg_progress.main.launch_ffmpeg')
+    mocker.patch('ffmpeg_progress.main.cpu_slice', return_value=(0, 1))
+    mock_echo = mocker.patch('ffmpeg_progress.main.click.echo')
+    mock_hot_folder.return_value.run.side_effect = KeyboardInterrupt
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    result = runner.invoke(main, [
+        'watch',
+        str(tmp_path), '-o',
+        str(out_dir), '--jobs', '2', '--suffix', '.mov', '-c:v', 'libx264'
+    ])
+    assert result.exit_code == 0
+    kwargs = mock_hot_folder.call_args.kwargs
+    assert mock_hot_folder.call_args.args == (tmp_path, out_dir)
+    assert kwargs['jobs'] == 2
+    assert kwargs['suffixes'] == ('.mov',)
+    kwargs['make_ffmpeg_func'](1)('a.mov', 'a.mkv', 'vstats')
+    mock_launch_ffmpeg.assert_called_once_with('a.mov',
+                                               'a.mkv',
+                                               'vstats',
+                                               args=['-c:v', 'libx264'],
+                                               cpus=(0, 1),
+                                               ionice_class=None,
+                                               ionice_value=None,
+                                               nice=None,
+                                               threads=None)
+    kwargs['on_started'](Path('a.mov'), Path('a.mkv'))
+    mock_echo.assert_called_with('Started: a.mov -> a.mkv')
+    kwargs['on_finished'](Path('a.mov'), None)
+    mock_echo.assert_called_with('Done: a.mov')
+    kwargs['on_finished'](Path('a.mov'), 'Probe failed.')
+    mock_echo.assert_called_with('Failed: a.mov: Probe failed.', err=True)
+
+
+def test_watch_same_output_dir(runner: CliRunner, tmp_path: Path) -> None:
+    result = runner.invoke(main, ['watch', str(tmp_path), '-o', str(tmp_path)])
+    assert result.exit_code != 0
+    assert 'must not be the watched directory' in result.output
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import json
+
+from ffmpeg_progress.tracing import Tracer
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def test_tracer_mark(mocker: MockerFixture) -> None:
+    mocker.patch('ffmpeg_progress.tracing.perf_counter_ns', side_effect=[0, 3000, 5000])
+    tracer = Tracer()
+    assert tracer.mark('liveness', 1000) == 3000
+    assert tracer.mark('liveness', 3000) == 5000
+    assert tracer.summary() == {
+        'liveness': {
+            'count': 2,
+            'max': 2e-6,
+            'mean': 2e-6,
+            'min': 2e-6,
+            'total': 4e-6
+        }
+    }
+
+
+def test_tracer_summary() -> None:
+    tracer = Tracer()
+    tracer.record('read', 0, 4000)
+    tracer.record('read', 0, 1000)
+    tracer.record('parse', 0, 2000)
+    summary = tracer.summary()
+    assert list(summary) == ['read', 'parse']
+    assert summary['read']['count'] == 2
+    assert summary['read']['min'] == 1e-6
+    assert summary['read']['max'] == 4e-6
+    assert summary['read']['mean'] == 2.5e-6
+    assert summary['parse']['total'] == 2e-6
+
+
+def test_tracer_empty() -> None:
+    tracer = Tracer()
+    assert tracer.summary() == {}
+    assert tracer.chrome_trace()['traceEvents'] == []
+
+
+def test_tracer_chrome_trace() -> None:
+    tracer = Tracer()
+    tracer.record('on_message', tracer.origin + 2000, tracer.origin + 5000)
+    event = tracer.chrome_trace()['traceEvents'][0]
+    assert event['name'] == 'on_message'
+    assert event['ph'] == 'X'
+    assert event['ts'] == 2.0
+    assert event['dur'] == 3.0
+
+
+def test_tracer_max_events() -> None:
+    tracer = Tracer(max_events=1)
+    tracer.record('probe', 0, 1000)
+    tracer.record('probe', 0, 1000)
+    assert len(tracer.chrome_trace()['traceEvents']) == 1
+    assert tracer.summary()['probe']['count'] == 2
+
+
+def test_tracer_write_chrome_trace(tmp_path: Path) -> None:
+    tracer = Tracer()
+    tracer.record('initial_wait', tracer.origin, tracer.origin + 1000)
+    path = tmp_path / 'trace.json'
+    tracer.write_chrome_trace(path)
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['displayTimeUnit'] == 'ms'
+    assert data['traceEvents'][0]['name'] == 'initial_wait'
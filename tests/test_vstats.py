@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from math import inf, isnan
+from typing import TYPE_CHECKING
+
+from ffmpeg_progress.vstats import (
+    VStatsHistory,
+    VStatsRecord,
+    iter_vstats_records,
+    parse_vstats_line,
+)
+import pytest
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+LINE_V2 = ('out=  0 st=  0 frame=    2 q= 28.0 PSNR= 41.25 f_size=  1234 s_size=      10kB '
+           'time= 0.080 br=  246.8kbits/s avg_br=  1000.0kbits/s type= P')
+LINE_V1 = ('frame=    1 q= 21.0 f_size=  4096 s_size=       4kB time= 0.040 br=  819.2kbits/s '
+           'avg_br=   819.2kbits/s type= I')
+
+
+def make_record(frame: int,
+                q: float = 20.0,
+                psnr: float = 40.0,
+                bitrate: float = 100.0,
+                picture_type: str = 'P') -> VStatsRecord:
+    return VStatsRecord(0, 0, frame, q, psnr, frame * 10, frame * 0.5, frame / 25, bitrate, bitrate,
+                        picture_type)
+
+
+def test_parse_vstats_line_v2() -> None:
+    assert parse_vstats_line(LINE_V2) == VStatsRecord(output=0,
+                                                      stream=0,
+                                                      frame=2,
+                                                      q=28.0,
+                                                      psnr=41.25,
+                                                      frame_size=1234,
+                                                      stream_size=10.0,
+                                                      time=0.08,
+                                                      bitrate=246.8,
+                                                      avg_bitrate=1000.0,
+                                                      picture_type='P')
+
+
+def test_parse_vstats_line_kib() -> None:
+    record = parse_vstats_line(LINE_V2.replace('10kB', '10KiB').replace('41.25', 'inf'))
+    assert record is not None
+    assert record.stream_size == 10.0
+    assert record.psnr == inf
+    assert record.avg_bitrate == 1000.0
+
+
+def test_parse_vstats_line_v1() -> None:
+    record = parse_vstats_line(LINE_V1)
+    assert record is not None
+    assert record.output == 0
+    assert record.frame == 1
+    assert record.picture_type == 'I'
+    assert isnan(record.psnr)
+
+
+@pytest.mark.parametrize('line', [
+    '', 'frame=    1 q= 21.0',
+    LINE_V1.replace('q= 21.0', 'q= x'),
+    LINE_V1.replace('time= 0.040', 'time= .040')
+])
+def test_parse_vstats_line_invalid(line: str) -> None:
+    assert parse_vstats_line(line) is None
+
+
+def test_iter_vstats_records(mocker: MockerFixture) -> None:
+    data = f'{LINE_V1}\ninvalid\n{LINE_V2}'.encode()
+    mock_pread = mocker.patch('ffmpeg_progress.vstats.os.pread',
+                              side_effect=lambda _fd, size, offset: data[offset:offset + size])
+    records = list(iter_vstats_records(123, 64))
+    assert [x.frame for x in records] == [1, 2]
+    mock_pread.assert_any_call(123, 64, 0)
+
+
+def test_history_ring_buffer() -> None:
+    history = VStatsHistory(3)
+    history.extend(
+        make_record(x, q=float(x), psnr=30.0 + x, bitrate=x * 100.0) for x in range(1, 6))
+    assert len(history) == 3
+    assert history.count == 5
+    assert [x.frame for x in history] == [3, 4, 5]
+    assert history.q_values == [3.0, 4.0, 5.0]
+    assert history.bitrates == [300.0, 400.0, 500.0]
+    assert history.psnr_values == [33.0, 34.0, 35.0]
+    assert history.psnr_percentile(50) == 34.0
+    assert history.psnr_percentile(25) == 33.5
+    assert next(iter(history)) == make_record(3, q=3.0, psnr=33.0, bitrate=300.0)
+
+
+def test_history_summary() -> None:
+    history = VStatsHistory()
+    history.append(make_record(1, q=30.0, psnr=35.0, bitrate=500.0, picture_type='I'))
+    history.append(make_record(2, q=20.0, psnr=float('nan'), bitrate=100.0))
+    history.append(make_record(3, q=25.0, psnr=45.0, bitrate=200.0))
+    assert len(history) == 3
+    assert history.summary() == {
+        'avg_bitrate': 200.0,
+        'duration': 0.12,
+        'frames': 3,
+        'max_bitrate': 500.0,
+        'max_frame_size': 30,
+        'picture_types': {
+            'I': 1,
+            'P': 2
+        },
+        'psnr_mean': 40.0,
+        'psnr_min': 35.0,
+        'psnr_p5': 35.5,
+        'psnr_p50': 40.0,
+        'q_max': 30.0,
+        'q_mean': 25.0,
+        'q_min': 20.0,
+        'records': 3,
+        'stream_size': 1.5
+    }
+
+
+def test_history_empty() -> None:
+    history = VStatsHistory(1)
+    assert len(history) == 0
+    assert not list(history)
+    assert isnan(history.psnr_percentile(50))
+    summary = history.summary()
+    assert summary['records'] == 0
+    assert summary['q_min'] is None
+    assert summary['psnr_p50'] is None
+
+
+def test_history_invalid_capacity() -> None:
+    with pytest.raises(ValueError, match='Capacity'):
+        VStatsHistory(0)
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+import json
+import subprocess as sp
+import tempfile
+import threading
+
+from ffmpeg_progress.exceptions import ProbeFailed
+from ffmpeg_progress.watch import DirectoryWatcher, HotFolder, StateJournal
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+
+def test_watcher_close_write(tmp_path: Path) -> None:
+    watcher = DirectoryWatcher(tmp_path, poll_interval=0.5)
+    (tmp_path / 'a.mov').write_bytes(b'data')
+    (tmp_path / '.hidden').write_bytes(b'data')
+    try:
+        assert watcher.poll() == [tmp_path / 'a.mov']
+    finally:
+        watcher.close()
+    watcher.close()
+
+
+def test_watcher_existing_files_settle(tmp_path: Path) -> None:
+    (tmp_path / 'a.mov').write_bytes(b'data')
+    (tmp_path / 'b.txt').write_bytes(b'data')
+    (tmp_path / 'sub').mkdir()
+    watcher = DirectoryWatcher(tmp_path, settle_time=0, poll_interval=0.01, suffixes=('.MOV',))
+    try:
+        assert watcher.poll() == [tmp_path / 'a.mov']
+        assert not watcher.poll()
+    finally:
+        watcher.close()
+
+
+def test_watcher_size_changes(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('ffmpeg_progress.watch._Inotify', side_effect=OSError)
+    mocker.patch('ffmpeg_progress.watch.sleep')
+    mocker.patch('ffmpeg_progress.watch.monotonic', side_effect=[0, 1, 1, 2, 2, 3, 3])
+    path = tmp_path / 'a.mov'
+    path.write_bytes(b'data')
+    watcher = DirectoryWatcher(tmp_path, settle_time=2)
+    path.write_bytes(b'more data')
+    assert not watcher.poll()  # Size changed at 1.
+    assert not watcher.poll()  # Unchanged for 1 second.
+    assert watcher.poll() == [path]
+
+
+def test_watcher_polling(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('ffmpeg_progress.watch._Inotify', side_effect=OSError)
+    mock_sleep = mocker.patch('ffmpeg_progress.watch.sleep')
+    watcher = DirectoryWatcher(tmp_path, settle_time=0)
+    path = tmp_path / 'a.mov'
+    path.write_bytes(b'data')
+    assert watcher.poll() == [path]
+    assert not watcher.poll()
+    path.unlink()
+    assert not watcher.poll()
+    path.write_bytes(b'data')
+    assert watcher.poll() == [path]
+    mock_sleep.assert_called_with(1.0)
+    watcher.close()
+
+
+def test_watcher_removed_before_ready(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('ffmpeg_progress.watch._Inotify', side_effect=OSError)
+    mocker.patch('ffmpeg_progress.watch.sleep')
+    path = tmp_path / 'a.mov'
+    path.write_bytes(b'data')
+    watcher = DirectoryWatcher(tmp_path, settle_time=10)
+    path.unlink()
+    assert not watcher.poll()
+
+
+def test_watcher_inotify_unavailable(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch('ffmpeg_progress.watch.ctypes.CDLL').return_value.inotify_init1.return_value = -1
+    mocker.patch('ffmpeg_progress.watch.sleep')
+    (tmp_path / 'a.mov').write_bytes(b'data')
+    watcher = DirectoryWatcher(tmp_path, settle_time=0)
+    assert watcher.poll() == [tmp_path / 'a.mov']
+
+
+def test_watcher_inotify_add_watch_fails(mocker: MockerFixture, tmp_path: Path) -> None:
+    mock_libc = mocker.patch('ffmpeg_progress.watch.ctypes.CDLL').return_value
+    mock_libc.inotify_init1.return_value = 100
+    mock_libc.inotify_add_watch.return_value = -1
+    mock_close = mocker.patch('ffmpeg_progress.watch.os.close')
+    mocker.patch('ffmpeg_progress.watch.sleep')
+    DirectoryWatcher(tmp_path).close()
+    mock_close.assert_called_once_with(100)
+
+
+def test_journal(tmp_path: Path) -> None:
+    journal_path = tmp_path / 'journal.jsonl'
+    in_file = tmp_path / 'a.mov'
+    in_file.write_bytes(b'data')
+    journal = StateJournal(journal_path)
+    assert not journal.is_processed(in_file)
+    journal.record(in_file, in_file.stat(), 'done', tmp_path / 'a.mkv')
+    assert journal.is_processed(in_file)
+    with journal_path.open('a', encoding='utf-8') as f:
+        f.write('[]\n{"file": "b.mov"\n')
+    reloaded = StateJournal(journal_path)
+    assert reloaded.is_processed(in_file)
+    entry = json.loads(journal_path.read_text(encoding='utf-8').splitlines()[0])
+    assert entry['status'] == 'done'
+    assert entry['output'] == str(tmp_path / 'a.mkv')
+    in_file.write_bytes(b'new data')
+    assert not reloaded.is_processed(in_file)
+    in_file.unlink()
+    assert reloaded.is_processed(in_file)
+
+
+@pytest.fixture
+def dirs(tmp_path: Path) -> tuple[Path, Path]:
+    in_dir = tmp_path / 'in'
+    out_dir = tmp_path / 'out'
+    in_dir.mkdir()
+    out_dir.mkdir()
+    return in_dir, out_dir
+
+
+def test_hot_folder_same_output_dir(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match='must not be the watched directory'):
+        HotFolder(tmp_path, tmp_path)
+
+
+def test_hot_folder_output_path(dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    assert HotFolder(in_dir, out_dir).output_path(in_dir / 'a.mov') == out_dir / 'a.mov'
+    assert HotFolder(in_dir, out_dir,
+                     extension='mkv').output_path(in_dir / 'a.mov') == out_dir / 'a.mkv'
+
+
+def test_hot_folder_process(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    vstats_path = in_dir.parent / 'vstats'
+    mock_process = mocker.Mock(spec=sp.Popen, returncode=0)
+    mock_ffmpeg_func = mocker.Mock(return_value=mock_process)
+    mock_make_ffmpeg_func = mocker.Mock(return_value=mock_ffmpeg_func)
+
+    def start(in_file: Path, outfile: Path, ffmpeg_func: Callable[[Path, Path, str], object],
+              **kwargs: object) -> None:
+        vstats_path.touch()
+        ffmpeg_func(in_file, outfile, str(vstats_path))
+        assert kwargs['initial_wait_time'] == 0
+
+    mocker.patch('ffmpeg_progress.watch.start', side_effect=start)
+    mock_on_started = mocker.Mock()
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir,
+                           out_dir,
+                           extension='.mkv',
+                           jobs=2,
+                           make_ffmpeg_func=mock_make_ffmpeg_func,
+                           on_finished=mock_on_finished,
+                           on_started=mock_on_started)
+    future = hot_folder.submit(in_file)
+    assert future is not None
+    future.result()
+
+    mock_make_ffmpeg_func.assert_called_once_with(0)
+    mock_ffmpeg_func.assert_called_once_with(in_file, out_dir / 'a.mkv', str(vstats_path))
+    mock_on_started.assert_called_once_with(in_file, out_dir / 'a.mkv')
+    mock_on_finished.assert_called_once_with(in_file, None)
+    assert not vstats_path.exists()
+    assert hot_folder.journal.is_processed(in_file)
+    assert hot_folder.submit(in_file) is None
+
+
+def test_hot_folder_process_ffmpeg_failed(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    mock_process = mocker.Mock(spec=sp.Popen, returncode=1)
+    mocker.patch('ffmpeg_progress.watch.start',
+                 side_effect=lambda in_file, outfile, ffmpeg_func, **_: ffmpeg_func(
+                     in_file, outfile, 'vstats'))
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir,
+                           out_dir,
+                           make_ffmpeg_func=lambda _: mocker.Mock(return_value=mock_process),
+                           on_finished=mock_on_finished)
+    hot_folder.process(in_file)
+
+    mock_on_finished.assert_called_once_with(in_file, 'ffmpeg exited with status 1.')
+    lines = hot_folder.journal.path.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[0])['status'] == 'failed'
+    assert hot_folder.journal.is_processed(in_file)
+
+
+def test_hot_folder_process_error(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    mocker.patch('ffmpeg_progress.watch.start', side_effect=ProbeFailed)
+    mock_reporter = mocker.patch('ffmpeg_progress.watch.ProgressReporter')
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir,
+                           out_dir,
+                           on_finished=mock_on_finished,
+                           report=True,
+                           socket_path='test.sock')
+    hot_folder.process(in_file)
+
+    mock_reporter.assert_called_once_with(in_file, socket_path='test.sock')
+    mock_on_finished.assert_called_once_with(in_file, 'Probe failed.')
+
+
+def test_hot_folder_process_probe_failed(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.txt'
+    in_file.write_bytes(b'not media')
+    mocker.patch('ffmpeg_progress.lib.sp.check_output',
+                 side_effect=sp.CalledProcessError(1, 'ffprobe'))
+    mock_ffmpeg_func = mocker.Mock()
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir,
+                           out_dir,
+                           make_ffmpeg_func=lambda _: mock_ffmpeg_func,
+                           on_finished=mock_on_finished)
+    hot_folder.process(in_file)
+
+    mock_ffmpeg_func.assert_not_called()
+    mock_on_finished.assert_called_once_with(in_file, 'Probe failed.')
+    lines = hot_folder.journal.path.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[0])['status'] == 'failed'
+
+
+def test_hot_folder_process_launch_failed(mocker: MockerFixture, dirs: tuple[Path, Path],
+                                          tmp_path: Path) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    vstats_dir = tmp_path / 'vstats'
+    vstats_dir.mkdir()
+    mocker.patch('ffmpeg_progress.lib.ffprobe',
+                 return_value={
+                     'streams': [{
+                         'avg_frame_rate': '25/1'
+                     }],
+                     'format': {
+                         'duration': '10'
+                     }
+                 })
+    mocker.patch('ffmpeg_progress.lib.mkstemp',
+                 side_effect=lambda **kwargs: tempfile.mkstemp(dir=vstats_dir, **kwargs))
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir,
+                           out_dir,
+                           make_ffmpeg_func=lambda _: mocker.Mock(side_effect=FileNotFoundError(
+                               2, 'No such file or directory', 'ffmpeg')),
+                           on_finished=mock_on_finished)
+    hot_folder.process(in_file)
+
+    mock_on_finished.assert_called_once_with(in_file, mocker.ANY)
+    assert 'ffmpeg' in mock_on_finished.call_args.args[1]
+    assert not any(vstats_dir.iterdir())
+
+
+def test_hot_folder_process_removed(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    mock_start = mocker.patch('ffmpeg_progress.watch.start')
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir, out_dir, on_finished=mock_on_finished)
+    hot_folder.process(in_dir / 'a.mov')
+
+    mock_start.assert_not_called()
+    mock_on_finished.assert_called_once_with(in_dir / 'a.mov', 'File was removed.')
+
+
+def test_hot_folder_process_stat_failed(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    mock_start = mocker.patch('ffmpeg_progress.watch.start')
+    mocker.patch('ffmpeg_progress.watch.Path.stat',
+                 side_effect=PermissionError(13, 'Permission denied'))
+    mock_on_finished = mocker.Mock()
+    HotFolder(in_dir, out_dir, on_finished=mock_on_finished).process(in_dir / 'a.mov')
+
+    mock_start.assert_not_called()
+    mock_on_finished.assert_called_once_with(in_dir / 'a.mov', '[Errno 13] Permission denied')
+
+
+def test_hot_folder_process_journal_failed(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    mocker.patch('ffmpeg_progress.watch.start')
+    mock_on_finished = mocker.Mock()
+    HotFolder(in_dir,
+              out_dir,
+              journal_path=in_dir / 'missing' / 'journal.jsonl',
+              on_finished=mock_on_finished).process(in_file)
+
+    mock_on_finished.assert_called_once_with(in_file, mocker.ANY)
+    assert mock_on_finished.call_args.args[1].startswith('Cannot write to the journal:')
+
+
+def test_hot_folder_process_raises(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    mock_start = mocker.patch('ffmpeg_progress.watch.start')
+    mock_on_finished = mocker.Mock()
+    hot_folder = HotFolder(in_dir,
+                           out_dir,
+                           on_finished=mock_on_finished,
+                           on_started=mocker.Mock(side_effect=RuntimeError))
+    future = hot_folder.submit(in_file)
+    assert future is not None
+    future.result()
+
+    mock_start.assert_not_called()
+    mock_on_finished.assert_called_once_with(in_file, 'RuntimeError')
+    lines = hot_folder.journal.path.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[0])['status'] == 'failed'
+    assert hot_folder.submit(in_file) is None
+
+
+def test_hot_folder_default_ffmpeg_func(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    in_file = in_dir / 'a.mov'
+    in_file.write_bytes(b'data')
+    mock_launch_ffmpeg = mocker.patch('ffmpeg_progress.watch.launch_ffmpeg')
+    mock_launch_ffmpeg.return_value.returncode = 0
+    mocker.patch('ffmpeg_progress.watch.cpu_slice', return_value=(0, 1))
+    mocker.patch('ffmpeg_progress.watch.start',
+                 side_effect=lambda in_file, outfile, ffmpeg_func, **_: ffmpeg_func(
+                     in_file, outfile, 'vstats'))
+    HotFolder(in_dir, out_dir, jobs=2).process(in_file)
+
+    mock_launch_ffmpeg.assert_called_once_with(in_file, out_dir / 'a.mov', 'vstats', cpus=(0, 1))
+
+
+def test_hot_folder_run(mocker: MockerFixture, dirs: tuple[Path, Path]) -> None:
+    in_dir, out_dir = dirs
+    stop = threading.Event()
+    mock_watcher = mocker.patch('ffmpeg_progress.watch.DirectoryWatcher').return_value
+
+    def poll() -> list[Path]:
+        stop.set()
+        return [in_dir / 'a.mov']
+
+    mock_watcher.poll.side_effect = poll
+    hot_folder = HotFolder(in_dir, out_dir)
+    mock_submit = mocker.patch.object(hot_folder, 'submit')
+    hot_folder.run(stop)
+
+    mock_submit.assert_called_once_with(in_dir / 'a.mov')
+    mock_watcher.close.assert_called_once()